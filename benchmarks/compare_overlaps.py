@@ -0,0 +1,53 @@
+"""
+Benchmarks comparing many areas with the travel regions of the default region
+files through compare_overlaps() against intersecting every region with every
+area, which is what compare_overlap() used to do.
+
+Usage: python benchmarks/compare_overlaps.py [--areas 200] [--radius 2]
+"""
+import argparse
+import time
+
+import numpy as np
+from shapely.geometry import Point
+
+from travel_regions import TravelRegions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--areas", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=2)
+    args = parser.parse_args()
+
+    travel_regions = TravelRegions()
+    # Circular areas around randomly chosen nodes stand in for admin areas
+    latlngs = travel_regions.node_store.latlngs
+    centers = latlngs[
+        np.random.default_rng(0).choice(len(latlngs), args.areas, replace=False)
+    ]
+    areas = [Point(*center).buffer(args.radius) for center in centers]
+    levels = list(travel_regions.regions.keys())
+    for level in levels:
+        for region in travel_regions.regions[level]:
+            region.area  # builds and caches the shape outside of the timings
+
+    start = time.perf_counter()
+    for area in areas:
+        for level in levels:
+            for region in travel_regions.regions[level]:
+                region.shape.intersection(area).area
+    baseline_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    travel_regions.compare_overlaps(areas, levels)
+    batch_time = time.perf_counter() - start
+
+    print(f"{args.areas} areas, levels {levels}")
+    print(f"intersecting every region: {baseline_time:.3f}s")
+    print(f"compare_overlaps():        {batch_time:.3f}s")
+    print(f"speedup:                   {baseline_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
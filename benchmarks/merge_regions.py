@@ -0,0 +1,94 @@
+"""
+Benchmarks merge_regions(), which dissolves each community's Voronoi regions
+by cancelling the edges they share, against unifying them with
+cascaded_union(), using the Voronoi regions of the default region model.
+
+Usage: python benchmarks/merge_regions.py [--levels 1 2 3 4] [--repeat 3]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from shapely.geometry import Polygon
+from shapely.ops import cascaded_union
+from shapely import vectorized
+
+from travel_regions._build import _split_communities, read_bounding_area
+from travel_regions._file_utils import read_region_model
+from travel_regions._geometry import generate_constrained_voronoi_diagram, merge_regions
+
+REGION_MODEL = os.path.join(
+    "data", "communities_-1__with_distance_multi-level_geonames_cities_7.csv"
+)
+BOUNDING_AREAS = [
+    os.path.join("data", "cutouts", "eu_af_as_au.geojson"),
+    os.path.join("data", "cutouts", "americas.geojson"),
+    os.path.join("data", "cutouts", "nz.geojson"),
+]
+
+
+def voronoi_clusters(region_model, bounding_area_shapes, level):
+    within_bounding_areas = [
+        vectorized.contains(
+            shape, region_model.latlngs[:, 0], region_model.latlngs[:, 1]
+        )
+        for shape in bounding_area_shapes
+    ]
+    community_IDs, nonoutlier_indices, _ = _split_communities(
+        region_model, within_bounding_areas, level, 4
+    )
+    clusters = [[] for _ in community_IDs]
+    for shape, indices_by_community in zip(bounding_area_shapes, nonoutlier_indices):
+        diagram = generate_constrained_voronoi_diagram(
+            region_model.latlngs[np.concatenate(indices_by_community)],
+            shape,
+            indices_by_community,
+        )
+        for cluster, cells in zip(clusters, diagram):
+            cluster += cells
+    return [cluster for cluster in clusters if cluster]
+
+
+def best_of(repeat, function, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    region_model = read_region_model(REGION_MODEL)
+    bounding_area_shapes = [
+        Polygon(read_bounding_area(path)) for path in BOUNDING_AREAS
+    ]
+    print(
+        f"{'level':>5} {'regions':>8} {'cells':>8} {'cascaded_union':>15} "
+        f"{'merge_regions':>14} {'speedup':>8} {'max. difference':>16}"
+    )
+    for level in args.levels:
+        clusters = voronoi_clusters(region_model, bounding_area_shapes, level)
+        baseline_time, baseline = best_of(
+            args.repeat, lambda: [cascaded_union(cluster) for cluster in clusters]
+        )
+        merge_time, merged = best_of(args.repeat, merge_regions, *clusters)
+        difference = max(
+            a.symmetric_difference(b).area / a.area for a, b in zip(baseline, merged)
+        )
+        print(
+            f"{level:>5} {len(clusters):>8} {sum(map(len, clusters)):>8} "
+            f"{baseline_time:>14.3f}s {merge_time:>13.3f}s "
+            f"{baseline_time / merge_time:>7.1f}x {difference:>16.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Load generator for the region lookup service. Keeps a number of concurrent
+clients sending requests over keep-alive connections and reports throughput
+as well as latency percentiles.
+
+Start the service first, e.g. once with and once without batching:
+
+    python -m travel_regions.serve
+    python -m travel_regions.serve --batch-window 0 --max-batch-size 1
+
+Usage: python benchmarks/serve_load.py [--endpoint regions] [--concurrency 64]
+    [--requests 5000] [--points 1]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+async def request(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    content = await reader.readexactly(content_length)
+    if status != 200:
+        raise RuntimeError(f"{status}: {content.decode()}")
+
+
+async def client(args, bodies, latencies):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while bodies:
+            body = bodies.pop()
+            start = time.perf_counter()
+            await request(reader, writer, args.host, f"/{args.endpoint}", body)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    rng = np.random.default_rng(0)
+    points = rng.uniform((-55, -180), (70, 180), (args.requests, args.points, 2))
+    bodies = [
+        json.dumps({"points": request_points.tolist()}).encode("utf-8")
+        for request_points in points
+    ]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[client(args, bodies, latencies) for _ in range(args.concurrency)]
+    )
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--endpoint", choices=["regions", "nearest"], default="regions")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=1, help="Points per request")
+    args = parser.parse_args()
+
+    elapsed, latencies = asyncio.run(run(args))
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    print(
+        f"{args.requests} requests to /{args.endpoint}, {args.points} point(s) "
+        f"each, {args.concurrency} concurrent clients"
+    )
+    print(f"throughput: {args.requests / elapsed:.0f} requests/s")
+    print(f"latency:    p50 {p50:.2f}ms, p90 {p90:.2f}ms, p99 {p99:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
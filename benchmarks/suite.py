@@ -0,0 +1,363 @@
+"""
+Benchmark suite timing the load, build, and query paths of TravelRegions at
+several input sizes and recording each benchmark's peak memory. Results can
+be saved as a baseline that later runs are compared against, failing if any
+benchmark got slower or allocates more than the thresholds allow.
+
+Usage: python benchmarks/suite.py [--filter points_to_regions] [--repeat 5]
+    [--save baseline.json] [--compare baseline.json] [--threshold 1.5]
+    [--memory-threshold 1.2]
+
+Times are the fastest of ``--repeat`` runs per call. Peak memory is measured
+in a separate run with tracemalloc, which sees Python and NumPy allocations
+but not those made inside GEOS.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import shapely
+from shapely.geometry import Point
+
+from travel_regions import TravelRegions
+
+REGION_MODEL = os.path.join(
+    "data", "communities_-1__with_distance_multi-level_geonames_cities_7.csv"
+)
+
+# Peak memory differences below this many bytes are noise, e.g. from
+# interpreter caches, rather than regressions
+MEMORY_TOLERANCE = 2 ** 20
+
+# Each benchmark's setup takes the shared context and an input size and
+# returns the function to be timed
+BENCHMARKS: List[Dict] = []
+
+
+def benchmark(name: str, sizes: List[Any], max_repeat: int = None):
+    def register(setup: Callable[["Context", Any], Callable[[], Any]]):
+        for size in sizes:
+            BENCHMARKS.append(
+                {
+                    "name": f"{name}[{size}]",
+                    "setup": setup,
+                    "size": size,
+                    "max_repeat": max_repeat,
+                }
+            )
+        return setup
+
+    return register
+
+
+class Context:
+    """
+    Inputs shared between benchmarks, created on first use
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.rng = np.random.default_rng(0)
+        self._travel_regions = None
+
+    @property
+    def travel_regions(self) -> TravelRegions:
+        if self._travel_regions is None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._travel_regions = TravelRegions()
+        return self._travel_regions
+
+    def random_points(self, n: int) -> np.ndarray:
+        # Uniformly distributed over the latitudes regions are found at
+        return self.rng.uniform((-55, -180), (70, 180), (n, 2))
+
+    def random_nodes(self, n: int) -> list:
+        nodes = list(self.travel_regions.nodes.values())
+        return [nodes[i] for i in self.rng.choice(len(nodes), n, replace=False)]
+
+    def region_model(self, rows: int) -> str:
+        # The default region model cut to its first rows
+        path = os.path.join(self.directory, f"region_model_{rows}.csv")
+        if not os.path.exists(path):
+            with open(REGION_MODEL, encoding="utf-8") as f:
+                lines = f.readlines()
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines[: rows + 1])
+        return path
+
+
+@benchmark("startup", ["levels=2", "levels=1-4"])
+def startup(context: Context, size: str):
+    levels = [2] if size == "levels=2" else None
+    return lambda: TravelRegions(levels=levels)
+
+
+@benchmark("build", [2000, 8000, 15865], max_repeat=1)
+def build(context: Context, rows: int):
+    path = context.region_model(rows)
+    return lambda: TravelRegions(region_model=path, levels=[2], use_cache=False)
+
+
+@benchmark("build_cached", [15865])
+def build_cached(context: Context, rows: int):
+    path = context.region_model(rows)
+    cache_dir = os.path.join(context.directory, "cache")
+    with contextlib.redirect_stdout(io.StringIO()):
+        TravelRegions(region_model=path, levels=[2], cache_dir=cache_dir)
+    return lambda: TravelRegions(region_model=path, levels=[2], cache_dir=cache_dir)
+
+
+@benchmark("points_to_regions", [1000, 10000, 100000])
+def points_to_regions(context: Context, n: int):
+    points = context.random_points(n)
+    return lambda: context.travel_regions.points_to_regions(points)
+
+
+@benchmark("get_nearest_node", [1])
+def get_nearest_node(context: Context, n: int):
+    point = tuple(context.random_points(n)[0])
+    return lambda: context.travel_regions.get_nearest_node(point)
+
+
+@benchmark("get_nearest_nodes", [1000, 10000])
+def get_nearest_nodes(context: Context, n: int):
+    points = context.random_points(n)
+    return lambda: context.travel_regions.get_nearest_nodes(points)
+
+
+@benchmark("find_node", [1])
+def find_node(context: Context, n: int):
+    name = context.random_nodes(n)[0].name
+    return lambda: context.travel_regions.find_node(name)
+
+
+@benchmark("find_nodes", [100, 1000])
+def find_nodes(context: Context, n: int):
+    names = [node.name for node in context.random_nodes(n)]
+    return lambda: context.travel_regions.find_nodes(names)
+
+
+@benchmark("find_region", [1, 10])
+def find_region(context: Context, n: int):
+    countries = sorted({node.country for node in context.travel_regions.nodes.values()})
+    countries = [countries[i] for i in context.rng.choice(len(countries), n)]
+    return lambda: context.travel_regions.find_region(countries)
+
+
+@benchmark("compare_overlap", ["radius=0.5", "radius=2", "radius=8"])
+def compare_overlap(context: Context, size: str):
+    area = Point(52.5, 13.4).buffer(float(size.split("=")[1]))
+    return lambda: context.travel_regions.compare_overlap(3, area)
+
+
+@benchmark("neighbors", ["level=2", "level=3", "level=4"])
+def neighbors(context: Context, size: str):
+    level = int(size.split("=")[1])
+    travel_regions = context.travel_regions
+
+    def run():
+        # Includes building the level's adjacency on the first query
+        travel_regions._adjacency.pop(level, None)
+        for region in travel_regions.regions[level]:
+            travel_regions.neighbors(region.id)
+
+    return run
+
+
+@benchmark("get_neighbors", ["level=2", "level=3", "level=4"])
+def get_neighbors(context: Context, size: str):
+    level = int(size.split("=")[1])
+    regions = context.travel_regions.regions[level]
+    sample = [
+        regions[i]
+        for i in context.rng.choice(len(regions), min(20, len(regions)), replace=False)
+    ]
+
+    def run():
+        for region in sample:
+            region.get_neighbors(regions)
+
+    return run
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Times a function and measures its peak memory
+
+    Args:
+        function (Callable[[], Any]): The function to benchmark
+        repeat (int): Number of timed runs
+
+    Returns:
+        Dict[str, float]: The fastest and median time per call in seconds as
+            well as the peak memory allocated during a call in bytes
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()  # warms up, e.g. builds lazily built indices
+        # Calibrate the number of calls per run so that fast functions are
+        # timed over ~50ms
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        number = max(1, int(0.05 / max(elapsed, 1e-9)))
+        times = [elapsed] if number == 1 else []
+        while len(times) < repeat:
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            times.append((time.perf_counter() - start) / number)
+        tracemalloc.start()
+        try:
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "time": min(times),
+        "median_time": statistics.median(times),
+        "peak_memory": peak_memory,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "shapely": shapely.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            break
+    return f"{seconds / scale:.2f}{unit}"
+
+
+def compare(
+    results: Dict[str, Dict],
+    baseline: Dict,
+    threshold: float,
+    memory_threshold: float,
+) -> List[str]:
+    """
+    Lists the benchmarks whose time or peak memory exceeds the baseline's by
+    more than the given factors
+
+    Args:
+        results (Dict[str, Dict]): This run's results
+        baseline (Dict): A file written with ``--save``
+        threshold (float): Maximum allowed ratio of time to baseline time
+        memory_threshold (float): Maximum allowed ratio of peak memory to
+            baseline peak memory. Increases below ``MEMORY_TOLERANCE`` are
+            ignored.
+
+    Returns:
+        List[str]: A description of each regression
+    """
+    if baseline.get("environment") != environment():
+        print(
+            "Warning: the baseline was recorded in a different environment, "
+            f"{baseline.get('environment')}"
+        )
+    print()
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        baseline_result = baseline["results"][name]
+        time_ratio = result["time"] / baseline_result["time"]
+        memory_ratio = result["peak_memory"] / max(baseline_result["peak_memory"], 1)
+        print(f"{name:<32} time {time_ratio:5.2f}x   peak memory {memory_ratio:5.2f}x")
+        if time_ratio > threshold:
+            regressions.append(
+                f"{name}: {format_time(result['time'])} vs. "
+                f"{format_time(baseline_result['time'])} ({time_ratio:.2f}x)"
+            )
+        if (
+            memory_ratio > memory_threshold
+            and result["peak_memory"] - baseline_result["peak_memory"]
+            > MEMORY_TOLERANCE
+        ):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory'] / 2 ** 20:.1f}MiB vs. "
+                f"{baseline_result['peak_memory'] / 2 ** 20:.1f}MiB "
+                f"({memory_ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose names contain this"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare with results saved earlier")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="Fail if a benchmark takes this many times as long as the baseline",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=1.2,
+        help="Fail if a benchmark's peak memory exceeds the baseline's this many times",
+    )
+    args = parser.parse_args()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        context = Context(directory)
+        print(f"{'benchmark':<32} {'time':>10} {'median':>10} {'peak memory':>12}")
+        for case in BENCHMARKS:
+            if args.filter not in case["name"]:
+                continue
+            # Reseed so that a benchmark's inputs don't depend on which
+            # benchmarks ran before it, e.g. with --filter
+            context.rng = np.random.default_rng(0)
+            function = case["setup"](context, case["size"])
+            result = measure(
+                function, min(args.repeat, case["max_repeat"] or args.repeat)
+            )
+            results[case["name"]] = result
+            print(
+                f"{case['name']:<32} {format_time(result['time']):>10} "
+                f"{format_time(result['median_time']):>10} "
+                f"{result['peak_memory'] / 2 ** 20:>9.1f}MiB"
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=4)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ region_mappings = travel_regions.points_to_regions(points)
 # Get a level 2 region's neighbors on the same hierarchical level
 l2_regions = travel_regions.regions[2]
 neighboring_regions = l2_regions[1].get_neighbors(l2_regions)
+# or, using the level's precomputed adjacency graph
+neighboring_regions = travel_regions.neighbors(l2_regions[1].id)
 
 # Filter regions by continent
 regions_south_america = travel_regions.get_continent_regions("SA")
@@ -16,18 +16,16 @@ test_requirements = []
 setup(
     author="Omar Sharaki",
     author_email="omarsharaki@gmail.com",
-    python_requires=">=3.5",
+    python_requires=">=3.8",
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
     ],
     description="A Software Library for Processing and Evaluating Travel Region Models",
+    entry_points={"console_scripts": ["travel-regions=travel_regions.cli:main"]},
     install_requires=requirements,
     long_description=readme,
     include_package_data=True,
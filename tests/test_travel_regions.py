@@ -4,9 +4,38 @@
 
 
 import unittest
+import asyncio
+import json
 import os
+import tempfile
+
+from haversine import haversine
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point, box, shape
+from shapely.ops import cascaded_union
 
 from travel_regions import TravelRegions
+from travel_regions.admin_regions import (
+    build_admin_region_store,
+    get_admin_region_geoms,
+)
+from travel_regions._build_cache import BuildCache
+from travel_regions._file_utils import (
+    get_communities,
+    read_csv,
+    read_region_model,
+    write_csv,
+)
+from travel_regions._geometry import (
+    detect_outliers_z_score,
+    detect_outliers_z_score_grouped,
+    dissolve_tiling,
+    geometry_to_shapely,
+)
+from travel_regions._map_features import Region
+from travel_regions.cli import classify_csv
+from travel_regions.serve import RegionServer
 import travel_regions
 
 
@@ -27,11 +56,13 @@ class TestTravel_regions(unittest.TestCase):
         # TravelRegions can be instantiated in one of 4 ways depending on which
         # constructor parameters receive arguments. The following flags can be
         # used to toggle which of the four instantiation methods to use when
-        # running testcases.
+        # running testcases. Custom region models can additionally be built
+        # across several processes.
         travel_regions_default = True
         travel_regions_model = False
         travel_regions_boundaries = False
         travel_regions_model_boundaries = False
+        travel_regions_model_parallel = False
 
         cls.travel_regions_default = TravelRegions() if travel_regions_default else None
         cls.travel_regions_model = (
@@ -72,11 +103,24 @@ class TestTravel_regions(unittest.TestCase):
             if travel_regions_model_boundaries
             else None
         )
+        cls.travel_regions_model_parallel = (
+            TravelRegions(
+                region_model=os.path.join(
+                    "data",
+                    "communities_-1__with_distance_multi-level_geonames_cities_7.csv",
+                ),
+                levels=4,
+                workers=2,
+            )
+            if travel_regions_model_parallel
+            else None
+        )
         cls.travel_regions_instances = [
             cls.travel_regions_default,
             cls.travel_regions_model,
             cls.travel_regions_boundaries,
             cls.travel_regions_model_boundaries,
+            cls.travel_regions_model_parallel,
         ]
 
     def tearDown(self):
@@ -88,6 +132,44 @@ class TestTravel_regions(unittest.TestCase):
             self.assertIsNotNone(nearest_node)
             self.assertEqual(nearest_node.id, "45")
 
+    def test_node_store(self):
+        for travel_regions in self.travel_regions_instances:
+            node_store = travel_regions.node_store
+            node = travel_regions.get_node("45")
+            self.assertEqual(node.id, "45")
+            self.assertEqual(node.latlng, tuple(node_store.latlngs[node.index]))
+            self.assertEqual(node.country, "US")
+            self.assertEqual(node.continent, "North America")
+            for level, region in node.regions.items():
+                self.assertIn(node, region.nodes)
+                self.assertEqual(
+                    region.index, node_store.region_indices[level][node.index]
+                )
+            german_nodes = node_store.continents[node_store.countries == "DE"]
+            self.assertTrue(len(german_nodes) > 0)
+            self.assertTrue(all(german_nodes == "EU"))
+
+    def test_get_nearest_nodes(self):
+        for travel_regions in self.travel_regions_instances:
+            point = (40.781459, -73.966551)
+            nearest_nodes = travel_regions.get_nearest_nodes([point], k=5)
+            self.assertEqual(len(nearest_nodes), 1)
+            self.assertEqual(len(nearest_nodes[0]), 5)
+            self.assertEqual(nearest_nodes[0][0].id, "45")
+            distances = [haversine(point, node.latlng) for node in nearest_nodes[0]]
+            self.assertEqual(distances, sorted(distances))
+
+            # k is capped at the number of nodes
+            nearest_nodes = travel_regions.get_nearest_nodes([point], k=10 ** 9)
+            self.assertEqual(len(travel_regions.nodes), len(nearest_nodes[0]))
+
+            # Nodes sitting on the query point itself are skipped
+            node = travel_regions.get_node("45")
+            nearest_nodes = travel_regions.get_nearest_nodes([node.latlng], k=3)
+            self.assertNotIn(
+                node.latlng, [nearest_node.latlng for nearest_node in nearest_nodes[0]]
+            )
+
     def test_points_to_regions(self):
         points = [
             [-14.269798, -40.821783],
@@ -106,6 +188,103 @@ class TestTravel_regions(unittest.TestCase):
                 set(region_IDs),
             )
 
+    def test_points_to_region_indices(self):
+        points = [
+            [-14.269798, -40.821783],
+            [-24.452236, -48.556158],
+            [-38.826944, -71.847173],
+        ]
+        for travel_regions in self.travel_regions_instances:
+            classifications = travel_regions.points_to_region_indices(points)
+            self.assertEqual(set(travel_regions.regions), set(classifications))
+            region_IDs = [
+                travel_regions.regions[level][index].id
+                for level, indices in classifications.items()
+                for index in indices
+                if index >= 0
+            ]
+            self.assertEqual(
+                set(["10", "22", "26", "24", "3154", "3113", "40", "415"]),
+                set(region_IDs),
+            )
+
+    def test_points_to_region_paths(self):
+        for travel_regions in self.travel_regions_instances:
+            points = travel_regions.node_store.latlngs[::10]
+            region_paths = travel_regions.points_to_region_paths(points)
+            classifications = travel_regions.points_to_region_indices(points)
+            self.assertEqual(set(classifications), set(region_paths))
+            for level, indices in region_paths.items():
+                region_index = travel_regions._get_region_index(level)
+                for i in np.flatnonzero(indices != classifications[level]):
+                    # Only points where regions overlap may be assigned differently
+                    self.assertGreaterEqual(indices[i], 0)
+                    self.assertTrue(region_index.contains(points[i], indices[i])[0])
+            self.assertEqual(
+                [region_paths[3][0]],
+                travel_regions.points_to_region_paths(points[:1], [3])[3].tolist(),
+            )
+            self.assertEqual(
+                ["10", "26", "3154", "415"],
+                [
+                    region.id
+                    for region in travel_regions.get_region_path(
+                        (-38.826944, -71.847173)
+                    )
+                ],
+            )
+            self.assertEqual({}, travel_regions.points_to_region_paths(points, []))
+            with self.assertRaises(ValueError):
+                travel_regions.points_to_region_paths(points, [2, 99])
+
+    def test_region_hierarchy(self):
+        for travel_regions in self.travel_regions_instances:
+            levels = sorted(travel_regions.regions)
+            for level in levels:
+                for region in travel_regions.regions[level]:
+                    for child in region.get_children():
+                        self.assertIs(region, child.get_parent())
+                    if level == levels[0]:
+                        self.assertIsNone(region.get_parent())
+                    elif region.get_parent() is not None:
+                        self.assertEqual(region.level - 1, region.get_parent().level)
+                        self.assertIn(region, region.get_parent().get_children())
+            self.assertEqual("26", travel_regions.get_region("3154").get_parent().id)
+
+    def test_detect_outliers_z_score_grouped(self):
+        for travel_regions in self.travel_regions_instances:
+            node_store = travel_regions.node_store
+            _, countries = np.unique(node_store.countries, return_inverse=True)
+            is_outlier = detect_outliers_z_score_grouped(
+                node_store.latlngs, countries, 2
+            )
+            for country in range(countries.max() + 1):
+                members = np.flatnonzero(countries == country)
+                outliers = detect_outliers_z_score(
+                    [tuple(latlng) for latlng in node_store.latlngs[members]], 2
+                )
+                self.assertEqual(
+                    [index for index, _ in outliers],
+                    np.flatnonzero(is_outlier[members]).tolist(),
+                )
+
+    def test_dissolve_tiling(self):
+        grid = {(x, y): box(x, y, x + 1, y + 1) for x in range(4) for y in range(4)}
+        ring = [cell for (x, y), cell in grid.items() if (x, y) != (1, 1)]
+        separate = [grid[0, 0], grid[0, 1], grid[2, 0], grid[3, 0]]
+        for cells in [list(grid.values()), ring, separate]:
+            dissolved = dissolve_tiling(cells)
+            self.assertIsNotNone(dissolved)
+            self.assertTrue(dissolved.is_valid)
+            expected = cascaded_union(cells)
+            self.assertEqual(expected.geom_type, dissolved.geom_type)
+            self.assertAlmostEqual(
+                0, expected.symmetric_difference(dissolved).area, places=9
+            )
+        self.assertEqual(1, len(dissolve_tiling(ring).interiors))
+        # Cells touching at a single vertex can't be traced unambiguously
+        self.assertIsNone(dissolve_tiling([grid[0, 0], grid[1, 1]]))
+
     def test_get_neighbors(self):
         for travel_regions in self.travel_regions_instances:
             l2_regions = travel_regions.regions[2]
@@ -117,6 +296,74 @@ class TestTravel_regions(unittest.TestCase):
                 set(["22", "27"]), set([region.id for region in neighboring_regions])
             )
 
+    def test_neighbors(self):
+        for travel_regions in self.travel_regions_instances:
+            neighboring_regions = travel_regions.neighbors("23")
+            self.assertEqual(
+                set(["22", "27"]), set([region.id for region in neighboring_regions])
+            )
+            adjacency_list = travel_regions.adjacency_list(2)
+            self.assertEqual(set(["22", "27"]), set(adjacency_list["23"]))
+            adjacency_matrix = travel_regions.adjacency_matrix(2)
+            self.assertEqual((adjacency_matrix != adjacency_matrix.T).nnz, 0)
+            self.assertEqual(
+                adjacency_matrix.nnz,
+                sum(len(neighbors) for neighbors in adjacency_list.values()),
+            )
+
+    def test_region_shape(self):
+        for travel_regions in self.travel_regions_instances:
+            region = travel_regions.get_region("22")
+            self.assertIs(region.shape, region.shape)
+            self.assertEqual(region.bounds, region.shape.bounds)
+            self.assertAlmostEqual(
+                region.area, geometry_to_shapely(region.geometry).area
+            )
+            self.assertTrue(
+                region.prepared_shape.contains(region.shape.representative_point())
+            )
+
+    def test_compare_overlaps(self):
+        for travel_regions in self.travel_regions_instances:
+            region = travel_regions.get_region("22")
+            areas = [
+                region.shape.buffer(1),
+                region.shape.representative_point().buffer(0.5),
+                box(*region.bounds),
+                Point(0, -170).buffer(1),
+            ]
+            overlaps = travel_regions.compare_overlaps(areas, [1, 2])
+            self.assertEqual({1, 2}, set(overlaps))
+            for level, (region_percentages, area_percentages) in overlaps.items():
+                level_regions = travel_regions.regions[level]
+                self.assertEqual(
+                    (len(level_regions), len(areas)), region_percentages.shape
+                )
+                for j, area in enumerate(areas):
+                    expected = {}
+                    for i, level_region in enumerate(level_regions):
+                        intersection = level_region.shape.intersection(area).area
+                        if intersection > 0:
+                            expected[i] = (
+                                intersection / level_region.area * 100,
+                                intersection / area.area * 100,
+                            )
+                    self.assertEqual(
+                        set(expected), set(region_percentages[:, j].nonzero()[0])
+                    )
+                    for i, (region_percentage, area_percentage) in expected.items():
+                        self.assertAlmostEqual(
+                            region_percentage, region_percentages[i, j]
+                        )
+                        self.assertAlmostEqual(area_percentage, area_percentages[i, j])
+                    self.assertEqual(
+                        {
+                            level_regions[i].id: percentages
+                            for i, percentages in expected.items()
+                        }.keys(),
+                        travel_regions.compare_overlap(level, area).keys(),
+                    )
+
     def test_get_country_regions(self):
         for travel_regions in self.travel_regions_instances:
             DE_regions = travel_regions.get_country_regions("de", 3)
@@ -136,6 +383,16 @@ class TestTravel_regions(unittest.TestCase):
             self.assertIsNotNone(regions_south_america)
             self.assertEqual(len(regions_south_america), 89)
 
+    def test_get_countries(self):
+        for travel_regions in self.travel_regions_instances:
+            region = travel_regions.get_region("22")
+            self.assertEqual(
+                sum(region.country_code_counts.values()), len(region.nodes)
+            )
+            country_counts = region.get_countries()
+            self.assertEqual(list(country_counts), region.countries)
+            self.assertEqual(country_counts["Brazil"], region.country_code_counts["BR"])
+
     def test_find_node(self):
         for travel_regions in self.travel_regions_instances:
             matching_nodes = travel_regions.find_node("Springfield")
@@ -159,11 +416,35 @@ class TestTravel_regions(unittest.TestCase):
                 set([matching_node.id for matching_node in matching_nodes]),
             )
 
+    def test_find_nodes(self):
+        for travel_regions in self.travel_regions_instances:
+            matching_nodes = travel_regions.find_nodes(["Springfield", "Munich"])
+            self.assertEqual(len(matching_nodes), 2)
+            self.assertEqual(
+                set(travel_regions.find_node("Springfield")), set(matching_nodes[0])
+            )
+            self.assertEqual(
+                set(travel_regions.find_node("Munich")), set(matching_nodes[1])
+            )
+            # Exact matches are ranked ahead of matches requiring an edit
+            matching_nodes = travel_regions.find_nodes(["Munich"], top_k=1)[0]
+            self.assertEqual(len(matching_nodes), 1)
+            self.assertIn("Munich", matching_nodes[0].name)
+
     def test_get_region(self):
         for travel_regions in self.travel_regions_instances:
             region = travel_regions.get_region("22")
             self.assertIsNotNone(region)
             self.assertEqual(region.id, "22")
+            self.assertIs(travel_regions.get_region(region.key), region)
+            self.assertIs(travel_regions.regions[region.level][region.index], region)
+            self.assertEqual(travel_regions.region_ids[2][region.index], "22")
+            self.assertIsNone(travel_regions.get_region("-1"))
+
+    def test_region_ids_are_unique(self):
+        self.assertNotEqual(
+            Region(1, 12, {}, []).generate_id(), Region(11, 2, {}, []).generate_id()
+        )
 
     def test_find_region(self):
         for travel_regions in self.travel_regions_instances:
@@ -173,3 +454,436 @@ class TestTravel_regions(unittest.TestCase):
                 set(["415", "10", "22", "23", "49"]),
                 set([matching_region.id for matching_region in matching_regions]),
             )
+
+    def test_export_regions_binary(self):
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "level_2_regions.bin")
+                travel_regions.export_regions(path, level=2)
+                loaded = TravelRegions(region_files=[path])
+                self.assertEqual([2], list(loaded.regions))
+                self.assertEqual(
+                    [region.id for region in travel_regions.regions[2]],
+                    [region.id for region in loaded.regions[2]],
+                )
+                region = loaded.get_region("22")
+                self.assertAlmostEqual(
+                    region.area, travel_regions.get_region("22").area
+                )
+                self.assertEqual(
+                    [node.id for node in region.nodes],
+                    [node.id for node in travel_regions.get_region("22").nodes],
+                )
+                # Binary region files can be exported back to JSON
+                json_path = os.path.join(directory, "level_2_regions.json")
+                loaded.export_regions(json_path, level=2)
+                self.assertEqual(
+                    [region.id for region in loaded.regions[2]],
+                    [
+                        region.id
+                        for region in TravelRegions(region_files=[json_path]).regions[2]
+                    ],
+                )
+
+    def test_export_regions_simplified(self):
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "level_3_regions.json")
+                travel_regions.export_regions(path, level=3, tolerance=0.1)
+                loaded = TravelRegions(region_files=[path])
+                self.assertEqual(
+                    [region.id for region in travel_regions.regions[3]],
+                    [region.id for region in loaded.regions[3]],
+                )
+                for region, simplified in zip(
+                    travel_regions.regions[3], loaded.regions[3]
+                ):
+                    self.assertEqual(
+                        region.geometry["type"], simplified.geometry["type"]
+                    )
+                    self.assertLessEqual(
+                        sum(
+                            len(polygon.exterior.coords)
+                            for polygon in simplified.polygons
+                        ),
+                        sum(
+                            len(polygon.exterior.coords) for polygon in region.polygons
+                        ),
+                    )
+                    self.assertLessEqual(
+                        region.shape.hausdorff_distance(simplified.shape), 0.1 + 1e-9
+                    )
+                region = travel_regions.get_region("22")
+                self.assertIs(
+                    region.get_simplified_geometry(0.1),
+                    region.get_simplified_geometry(0.1),
+                )
+
+    def test_export_tiles(self):
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                serial = os.path.join(directory, "serial")
+                parallel = os.path.join(directory, "parallel")
+                tile_counts = travel_regions.export_tiles(serial, 2, [0, 1, 2])
+                self.assertEqual(
+                    tile_counts,
+                    travel_regions.export_tiles(parallel, 2, [0, 1, 2], workers=2),
+                )
+                self.assertEqual(1, tile_counts[0])
+                # The directory is created even if no tiles are written
+                empty = os.path.join(directory, "empty")
+                self.assertEqual({}, travel_regions.export_tiles(empty, 2, []))
+                self.assertTrue(os.path.exists(os.path.join(empty, "metadata.json")))
+                for zoom, tile_count in tile_counts.items():
+                    paths = [
+                        os.path.join(str(zoom), x, y)
+                        for x in os.listdir(os.path.join(serial, str(zoom)))
+                        for y in os.listdir(os.path.join(serial, str(zoom), x))
+                    ]
+                    self.assertEqual(tile_count, len(paths))
+                    for path in paths:
+                        with open(os.path.join(serial, path)) as f:
+                            tile = f.read()
+                        with open(os.path.join(parallel, path)) as f:
+                            self.assertEqual(tile, f.read())
+                with open(os.path.join(serial, "0", "0", "0.geojson")) as f:
+                    features = json.load(f)["features"]
+                self.assertEqual(
+                    [region.id for region in travel_regions.regions[2]],
+                    [feature["id"] for feature in features],
+                )
+                # Coordinates are (lng, lat) and quantized
+                tile_region = shape(
+                    next(
+                        feature["geometry"]
+                        for feature in features
+                        if feature["id"] == "22"
+                    )
+                )
+                min_lng, min_lat, max_lng, max_lat = tile_region.bounds
+                expected_bounds = travel_regions.get_region("22").bounds
+                self.assertAlmostEqual(expected_bounds[0], min_lat, places=1)
+                self.assertAlmostEqual(expected_bounds[3], max_lng, places=1)
+                lngs = np.concatenate(
+                    [
+                        np.asarray(polygon.exterior.coords)[:, 0]
+                        for polygon in getattr(tile_region, "geoms", [tile_region])
+                    ]
+                )
+                self.assertTrue(np.array_equal(lngs, np.round(lngs, 2)))
+
+    def test_export_regions_streamed(self):
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                for filename, precision in [
+                    ("level_2_regions.json", None),
+                    ("level_2_regions.json.gz", 5),
+                    ("level_2_regions.geojson", None),
+                    ("level_2_regions.geojson.gz", 3),
+                ]:
+                    path = os.path.join(directory, filename)
+                    travel_regions.export_regions(path, level=2, precision=precision)
+                    loaded = TravelRegions(region_files=[path])
+                    self.assertEqual(
+                        [region.id for region in travel_regions.regions[2]],
+                        [region.id for region in loaded.regions[2]],
+                    )
+                    region = travel_regions.get_region("22")
+                    loaded_region = loaded.get_region("22")
+                    self.assertEqual(
+                        [node.id for node in region.nodes],
+                        [node.id for node in loaded_region.nodes],
+                    )
+                    if precision is None:
+                        self.assertEqual(region.area, loaded_region.area)
+                    else:
+                        self.assertAlmostEqual(
+                            region.area, loaded_region.area, places=precision - 1
+                        )
+                        self.assertTrue(
+                            all(
+                                np.array_equal(polygon, np.round(polygon, precision))
+                                for polygon in loaded_region.geometry["geometry"]
+                            )
+                        )
+                with open(os.path.join(directory, "level_2_regions.geojson")) as f:
+                    feature_collection = json.load(f)
+                self.assertEqual("FeatureCollection", feature_collection["type"])
+                self.assertEqual(
+                    len(travel_regions.regions_serialized[2]["geometries"]),
+                    len(feature_collection["features"]),
+                )
+
+    def test_read_region_model(self):
+        path = os.path.join(
+            "data", "communities_-1__with_distance_multi-level_geonames_cities_7.csv"
+        )
+        data = read_csv(path)
+        region_model = read_region_model(path, chunk_size=1000)
+        self.assertEqual(len(data) - 1, len(region_model))
+        self.assertEqual(data[0], region_model.header)
+        self.assertEqual(data[1234], region_model.get_row(1233))
+        for level in (1, 3):
+            communities = get_communities(data, level)
+            community_IDs, members_by_community = region_model.get_communities(level)
+            self.assertEqual(list(communities), community_IDs)
+            self.assertEqual(
+                communities[community_IDs[-1]],
+                [region_model.get_row(i) for i in members_by_community[-1]],
+            )
+
+    def test_admin_region_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shapefile_path = os.path.join(directory, "admin_1.shp")
+            store_path = os.path.join(directory, "admin_region_geoms.bin")
+            gpd.GeoDataFrame(
+                {
+                    "iso_a2": ["DE", "DE", "DE", "NZ"],
+                    "gn_name": ["Bayern", "Bayern", "Hessen", "Otago"],
+                    "geometry": [
+                        box(10, 47, 12, 49),
+                        box(12, 47, 13, 49),
+                        box(8, 49, 10, 51),
+                        box(169, -46, 171, -44),
+                    ],
+                }
+            ).to_file(shapefile_path)
+            from_shapefile = get_admin_region_geoms("de", store_path, shapefile_path)
+            build_admin_region_store(shapefile_path, store_path)
+            from_store = get_admin_region_geoms("de", store_path, shapefile_path)
+            self.assertEqual(["Germany", "Bayern", "Hessen"], list(from_store))
+            self.assertEqual(list(from_shapefile), list(from_store))
+            for name, region in from_store.items():
+                self.assertTrue(region.equals(from_shapefile[name]))
+            # Coordinates are flipped to (lat, lng)
+            self.assertEqual((47, 10, 49, 13), from_store["Bayern"].bounds)
+            self.assertEqual(
+                (-46, 169, -44, 171),
+                get_admin_region_geoms("NZ", store_path)["Otago"].bounds,
+            )
+            from_store["Hessen"] = None  # doesn't affect the cached geometries
+            self.assertIsNotNone(get_admin_region_geoms("DE", store_path)["Hessen"])
+            with self.assertRaises(Exception):
+                get_admin_region_geoms("FR", store_path, shapefile_path)
+
+    def test_build_cache(self):
+        region_model = os.path.join(
+            "data", "communities_-1__with_distance_multi-level_geonames_cities_7.csv"
+        )
+        bounding_area_paths = [os.path.join("data", "cutouts", "nz.geojson")]
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                build_cache = BuildCache(directory)
+                keys = build_cache.keys(
+                    region_model, bounding_area_paths, [1, 2], 4, 10
+                )
+                self.assertNotEqual(keys[1], keys[2])
+                self.assertEqual(
+                    keys,
+                    build_cache.keys(region_model, bounding_area_paths, [1, 2], 4, 10),
+                )
+                self.assertNotEqual(
+                    keys,
+                    build_cache.keys(region_model, bounding_area_paths, [1, 2], 3, 10),
+                )
+                self.assertIsNone(build_cache.get(keys[2]))
+                build_cache.put(keys[2], travel_regions.regions_serialized[2])
+                self.assertEqual(
+                    travel_regions.regions_serialized[2]["community_IDs"],
+                    build_cache.get(keys[2])["community_IDs"],
+                )
+                # Least recently used entries are evicted once the cache is full
+                build_cache.put(keys[1], travel_regions.regions_serialized[1])
+                self.assertIsNotNone(build_cache.get(keys[2]))
+                build_cache.max_size = os.path.getsize(build_cache._path(keys[2]))
+                build_cache.evict()
+                self.assertIsNone(build_cache.get(keys[1]))
+                self.assertIsNotNone(build_cache.get(keys[2]))
+
+    def test_incremental_build(self):
+        region_model = os.path.join(
+            "data", "communities_-1__with_distance_multi-level_geonames_cities_7.csv"
+        )
+        bounding_area_path = os.path.join("data", "cutouts", "americas.geojson")
+        previous = TravelRegions(
+            bounding_area_path, region_model=region_model, levels=[3], use_cache=False
+        )
+        data = read_csv(region_model)
+        for row in data[1:]:
+            if row[0] == "45":
+                row[-3] = str(float(row[-3]) + 0.05)
+        with tempfile.TemporaryDirectory() as directory:
+            changed_region_model = os.path.join(directory, "region_model.csv")
+            write_csv(data[1:], headers=data[0], path=changed_region_model)
+            updated = TravelRegions(
+                bounding_area_path,
+                region_model=changed_region_model,
+                levels=[3],
+                use_cache=False,
+                previous=previous,
+            )
+            rebuilt = TravelRegions(
+                bounding_area_path,
+                region_model=changed_region_model,
+                levels=[3],
+                use_cache=False,
+            )
+        self.assertEqual(
+            rebuilt.regions_serialized[3]["nodes"],
+            updated.regions_serialized[3]["nodes"],
+        )
+        carried_over = 0
+        for previous_geometry, geometry, rebuilt_geometry in zip(
+            previous.regions_serialized[3]["geometries"],
+            updated.regions_serialized[3]["geometries"],
+            rebuilt.regions_serialized[3]["geometries"],
+        ):
+            if geometry is previous_geometry:
+                carried_over += 1
+            elif rebuilt_geometry:
+                self.assertAlmostEqual(
+                    geometry_to_shapely(geometry)
+                    .symmetric_difference(geometry_to_shapely(rebuilt_geometry))
+                    .area,
+                    0,
+                )
+        # Only the regions around the moved node are regenerated
+        self.assertTrue(
+            0 < len(previous.regions_serialized[3]["geometries"]) - carried_over < 10
+        )
+
+    def test_levels(self):
+        for travel_regions in self.travel_regions_instances:
+            l2_travel_regions = TravelRegions(levels=[2])
+            self.assertEqual([2], list(l2_travel_regions.regions))
+            self.assertEqual(
+                [region.id for region in travel_regions.regions[2]],
+                [region.id for region in l2_travel_regions.regions[2]],
+            )
+            self.assertIsNotNone(l2_travel_regions.get_region("22"))
+            self.assertIsNone(l2_travel_regions.get_region("10"))
+
+    def test_region_server(self):
+        async def post(port, path, payload):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps(payload).encode("utf-8")
+            writer.write(
+                f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            response = await reader.read()
+            writer.close()
+            head, _, content = response.partition(b"\r\n\r\n")
+            return int(head.split()[1]), json.loads(content)
+
+        points = [(-38.826944, -71.847173), (52.5, 13.4), (0, -30), (35.7, 139.7)]
+        for travel_regions in self.travel_regions_instances:
+            server = RegionServer(travel_regions, batch_window=0.05)
+
+            async def run():
+                running_server = await server.start(port=0)
+                port = running_server.sockets[0].getsockname()[1]
+                try:
+                    return await asyncio.gather(
+                        *[
+                            post(port, "/regions", {"points": [point]})
+                            for point in points
+                        ],
+                        post(port, "/regions", {"points": points, "levels": [3]}),
+                        post(port, "/nearest", {"points": points, "k": 2}),
+                        *[post(port, path, payload) for path, payload in invalid],
+                    )
+                finally:
+                    running_server.close()
+
+            invalid = [
+                ("/regions", {"points": [1, 2, 3]}),
+                ("/nearest", {"points": [[float("nan"), 1]]}),
+                ("/regions", {"points": [[91, 0]]}),
+                ("/regions", {"points": [points[0]], "levels": [True]}),
+                ("/nearest", {"points": [points[0]], "k": 10 ** 8}),
+            ]
+            responses = asyncio.run(run())
+            single = responses[: len(points)]
+            (status, batch), (nearest_status, nearest) = responses[
+                len(points) : len(points) + 2
+            ]
+            # All region requests were answered by one batched classification
+            self.assertEqual(1, server.region_batcher.batches)
+            # Invalid requests are rejected without failing the requests
+            # batched with them
+            self.assertEqual(
+                [400] * len(invalid),
+                [status for status, _ in responses[len(points) + 2 :]],
+            )
+            self.assertEqual(200, status)
+            self.assertEqual(200, nearest_status)
+            for point, (_, response), region_id in zip(
+                points, single, batch["regions"]["3"]
+            ):
+                regions = travel_regions.points_to_regions([point])
+                self.assertEqual(
+                    sorted(
+                        region_id for region_id, matches in regions.items() if matches
+                    ),
+                    sorted(
+                        filter(None, (ids[0] for ids in response["regions"].values()))
+                    ),
+                )
+                self.assertEqual(response["regions"]["3"], [region_id])
+            self.assertEqual(
+                [
+                    [node.id for node in row]
+                    for row in travel_regions.get_nearest_nodes(points, 2)
+                ],
+                [[node["id"] for node in row] for row in nearest["nodes"]],
+            )
+
+    def test_classify_csv(self):
+        points = [(-38.826944, -71.847173), (0, -30), (52.5, 13.4), (35.7, 139.7)]
+        for travel_regions in self.travel_regions_instances:
+            with tempfile.TemporaryDirectory() as directory:
+                input_path = os.path.join(directory, "points.csv")
+                write_csv(
+                    [[f"place {i}", *point] for i, point in enumerate(points * 5)],
+                    headers=["name", "latitude", "longitude"],
+                    path=input_path,
+                )
+                outputs = []
+                for workers in (None, 2):
+                    output_path = os.path.join(directory, f"classified_{workers}.csv")
+                    rows = classify_csv(
+                        travel_regions,
+                        input_path,
+                        output_path,
+                        levels=[2, 3],
+                        chunk_size=3,
+                        workers=workers,
+                    )
+                    self.assertEqual(len(points) * 5, rows)
+                    outputs.append(read_csv(output_path))
+                self.assertEqual(outputs[0], outputs[1])
+                header, *classified = outputs[0]
+                self.assertEqual(
+                    [
+                        "name",
+                        "latitude",
+                        "longitude",
+                        "region_level_2",
+                        "region_level_3",
+                    ],
+                    header,
+                )
+                region_indices = travel_regions.points_to_region_indices(
+                    points * 5, [2, 3]
+                )
+                for i, row in enumerate(classified):
+                    self.assertEqual(f"place {i}", row[0])
+                    for level, region_id in zip((2, 3), row[3:]):
+                        index = region_indices[level][i]
+                        expected = travel_regions.region_ids[level][index]
+                        self.assertEqual(expected if index >= 0 else "", region_id)
+                empty_path = os.path.join(directory, "empty.csv")
+                open(empty_path, "w").close()
+                with self.assertRaises(ValueError):
+                    classify_csv(travel_regions, empty_path, output_path)
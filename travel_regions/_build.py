@@ -0,0 +1,387 @@
+"""
+The pipeline that turns a region model into serialized regions: outlier
+detection, constrained Voronoi diagrams, and the merging of each community's
+Voronoi regions into a single geometry.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+from shapely import vectorized
+from scipy.spatial import Delaunay
+from shapely.geometry import Polygon
+
+from ._file_utils import RegionModel, read_geo_json
+from ._geometry import (
+    detect_outliers_z_score_grouped,
+    extract_geometries,
+    generate_constrained_voronoi_diagram,
+    merge_regions,
+)
+
+
+def read_bounding_area(path: str) -> List[List[float]]:
+    """
+    Reads a bounding area from a GeoJSON file
+
+    Args:
+        path (str): Path to a GeoJSON file whose first feature is a polygon
+
+    Returns:
+        List[List[float]]: The polygon's exterior as latitude/longitude pairs
+    """
+    bounding_area = read_geo_json(path)
+    return list(
+        map(
+            lambda point: [point[1], point[0]],
+            bounding_area["geometry"]["coordinates"][0],
+        )
+    )  # flipping coordinates for geovoronoi and Leaflet compatibility
+
+
+def _map(executor: Executor, fn: Callable, iterable: Iterable, chunksize: int = 1):
+    # Executor.map preserves the order of its inputs just like map does, which
+    # keeps parallel builds identical to serial ones
+    if executor is None:
+        return map(fn, iterable)
+    return executor.map(fn, iterable, chunksize=chunksize)
+
+
+def _generate_voronoi_regions(args: Tuple) -> List[List[Polygon]]:
+    return generate_constrained_voronoi_diagram(*args)
+
+
+def _merge_community(voronoi_regions: List[Polygon]) -> Dict:
+    # Unifies a community's single-point voronoi regions into a single polygon
+    return extract_geometries(*merge_regions(voronoi_regions))[0]
+
+
+def _concatenate_communities(
+    indices_by_community: List[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Returns the node indices of all communities ordered by community, along
+    # with the community of each
+    return (
+        np.concatenate(indices_by_community),
+        np.repeat(
+            np.arange(len(indices_by_community)),
+            [len(indices) for indices in indices_by_community],
+        ),
+    )
+
+
+def _split_communities(
+    region_model: RegionModel,
+    within_bounding_areas: List[np.ndarray],
+    level: int,
+    z_score_threshold: int,
+) -> Tuple[List[int], List[List[np.ndarray]], List[List[List[str]]]]:
+    # Splits a level's nodes into communities and determines each community's
+    # outliers as well as its nonoutliers within each bounding area
+    community_IDs, members_by_community = region_model.get_communities(level)
+    member_indices, member_communities = _concatenate_communities(members_by_community)
+    communities = np.empty(len(region_model), dtype=np.intp)
+    communities[member_indices] = member_communities
+    is_outlier = detect_outliers_z_score_grouped(
+        region_model.latlngs, communities, z_score_threshold
+    )
+    outliers_by_community = [
+        [region_model.get_row(i) for i in members[is_outlier[members]]]
+        for members in members_by_community
+    ]
+    nonoutlier_indices = [
+        [
+            members[~is_outlier[members] & within[members]]
+            for members in members_by_community
+        ]
+        for within in within_bounding_areas
+    ]
+    return community_IDs, nonoutlier_indices, outliers_by_community
+
+
+def _delaunay_neighbors(coordinates: np.ndarray, selected: np.ndarray) -> np.ndarray:
+    # Returns which of the given coordinates are selected or Delaunay neighbors
+    # of selected ones. Duplicate coordinates share a Voronoi region and are
+    # triangulated only once.
+    unique_coordinates, unique_indices = np.unique(
+        coordinates, axis=0, return_inverse=True
+    )
+    unique_indices = unique_indices.reshape(-1)
+    selected_unique = np.zeros(len(unique_coordinates), dtype=bool)
+    selected_unique[unique_indices[selected]] = True
+    indptr, neighbors = Delaunay(unique_coordinates).vertex_neighbor_vertices
+    neighborhood = selected_unique.copy()
+    for i in np.flatnonzero(selected_unique):
+        neighborhood[neighbors[indptr[i] : indptr[i + 1]]] = True
+    return neighborhood[unique_indices]
+
+
+def _find_changed_communities(
+    previous_regions_serialized: Dict,
+    community_IDs: List[int],
+    nonoutlier_indices: List[List[np.ndarray]],
+    region_model: RegionModel,
+    bounding_area_shapes: List[Polygon],
+) -> np.ndarray:
+    # Determines the communities whose regions may differ from the previous
+    # build: those with changed nonoutliers and those with nodes whose Voronoi
+    # regions changed, i.e. Delaunay neighbors of added or removed nodes
+    previous_nodes = dict(
+        zip(
+            previous_regions_serialized["community_IDs"],
+            previous_regions_serialized["nodes"],
+        )
+    )
+    changed = np.array(
+        [community_ID not in previous_nodes for community_ID in community_IDs]
+    )
+    for shape, indices_by_community in zip(bounding_area_shapes, nonoutlier_indices):
+        # The previous build only stores the nonoutliers of all bounding areas
+        # combined, but a node was part of a bounding area iff it lies within it
+        previous_nodes_of_area = {}
+        for community_ID, nodes in previous_nodes.items():
+            if len(nodes) == 0:
+                continue
+            node_latlngs = np.array(
+                [node["latlng"] for node in nodes], dtype=np.float64
+            ).reshape(-1, 2)
+            within = vectorized.contains(shape, node_latlngs[:, 0], node_latlngs[:, 1])
+            previous_nodes_of_area[community_ID] = [
+                (str(node["id"]), tuple(latlng))
+                for node, latlng, is_within in zip(nodes, node_latlngs.tolist(), within)
+                if is_within
+            ]
+        for i, (community_ID, indices) in enumerate(
+            zip(community_IDs, indices_by_community)
+        ):
+            if previous_nodes_of_area.get(community_ID, []) != [
+                (str(region_model.ids[j]), tuple(latlng))
+                for j, latlng in zip(indices, region_model.latlngs[indices].tolist())
+            ]:
+                changed[i] = True
+
+        previous_coordinates = [
+            latlng for nodes in previous_nodes_of_area.values() for _, latlng in nodes
+        ]
+        area_indices, area_communities = _concatenate_communities(indices_by_community)
+        coordinates = list(map(tuple, region_model.latlngs[area_indices].tolist()))
+        previous_set = set(previous_coordinates)
+        current_set = set(coordinates)
+        if min(len(previous_set), len(current_set)) < 5:
+            changed[area_communities] = True  # too few nodes to triangulate
+            continue
+        # Voronoi regions around added nodes shrink and those around removed
+        # ones grow
+        added = np.array([latlng not in previous_set for latlng in coordinates])
+        removed = np.array(
+            [latlng not in current_set for latlng in previous_coordinates]
+        )
+        affected_coordinates = {
+            latlng
+            for latlng, is_affected in zip(
+                coordinates, _delaunay_neighbors(np.array(coordinates), added)
+            )
+            if is_affected
+        } | {
+            latlng
+            for latlng, is_affected in zip(
+                previous_coordinates,
+                _delaunay_neighbors(np.array(previous_coordinates), removed),
+            )
+            if is_affected
+        }
+        changed[
+            area_communities[[latlng in affected_coordinates for latlng in coordinates]]
+        ] = True
+    return np.flatnonzero(changed)
+
+
+def build_regions(
+    region_model: RegionModel,
+    levels: List[int],
+    bounding_area_paths: List[str],
+    z_score_threshold: int,
+    workers: int = None,
+    previous_regions_serialized: Dict[int, Dict] = None,
+) -> Dict[int, Dict]:
+    """
+    Builds the serialized regions of a region model's hierarchical levels.
+
+    The Voronoi diagrams of all levels and bounding areas and the merging of
+    all communities' Voronoi regions are independent of each other. If
+    ``workers`` is given, they are spread across a pool of processes. Results
+    are collected in submission order, so the output is identical to that of
+    a serial build.
+
+    If a previous build of the same levels and bounding areas is given, e.g.
+    one of an older version of the region model, only the regions of
+    communities whose nonoutlier nodes changed or that border on added,
+    moved, or removed nodes are regenerated. Their Voronoi regions are
+    computed from these communities' nodes and their Delaunay neighbors
+    alone, which yields the same Voronoi regions as the full diagram. All
+    other geometries are carried over from the previous build as they are.
+
+    Args:
+        region_model (RegionModel): The region model
+        levels (List[int]): The hierarchical levels to build
+        bounding_area_paths (List[str]): Paths to GeoJSON files describing the
+            areas the regions are constrained to
+        z_score_threshold (int): Controls how far away nodes are allowed to
+            be from the centers of their communities without being considered
+            outliers.
+        workers (int, optional): Number of worker processes. Defaults to None,
+            i.e. building in the current process.
+        previous_regions_serialized (Dict[int, Dict], optional): The
+            serialized regions of a previous build to update. Levels it lacks
+            or that were built with other bounding areas are built from
+            scratch. Defaults to None.
+
+    Returns:
+        Dict[int, Dict]: The serialized regions of each level, see
+            ``TravelRegions.regions_serialized``
+    """
+    bounding_areas = [read_bounding_area(path) for path in bounding_area_paths]
+    bounding_area_shapes = [Polygon(bounding_area) for bounding_area in bounding_areas]
+    previous_regions_serialized = previous_regions_serialized or {}
+
+    ###############################################
+    # Outlier detection and bounding area filters #
+    ###############################################
+    latlngs = region_model.latlngs
+    ids = region_model.ids.tolist()
+    latitudes = region_model.latitudes.tolist()
+    longitudes = region_model.longitudes.tolist()
+    within_bounding_areas = [
+        vectorized.contains(bounding_area_shape, latlngs[:, 0], latlngs[:, 1])
+        for bounding_area_shape in bounding_area_shapes
+    ]
+    regions_serialized = {}
+    voronoi_tasks = []
+    voronoi_task_indices = {}
+    rebuilt_communities = {}
+    for level in levels:
+        community_IDs, nonoutlier_indices, outliers_by_community = _split_communities(
+            region_model, within_bounding_areas, level, z_score_threshold
+        )
+        regions_serialized[level] = {
+            "level": level,
+            "community_IDs": community_IDs,
+            "bounding_area": bounding_areas,
+            "geometries": None,
+            "nodes": [
+                [
+                    {"id": ids[j], "latlng": [latitudes[j], longitudes[j]]}
+                    for indices_by_community in nonoutlier_indices
+                    for j in indices_by_community[i]
+                ]
+                for i in range(len(community_IDs))
+            ],
+            # Outliers are recorded once per bounding area
+            "outliers": [
+                list(community_outliers)
+                for _ in bounding_areas
+                for community_outliers in outliers_by_community
+            ],
+        }
+
+        previous = previous_regions_serialized.get(level)
+        if previous is not None and previous["bounding_area"] == bounding_areas:
+            rebuilt_communities[level] = _find_changed_communities(
+                previous,
+                community_IDs,
+                nonoutlier_indices,
+                region_model,
+                bounding_area_shapes,
+            )
+        else:
+            rebuilt_communities[level] = np.arange(len(community_IDs))
+
+        voronoi_task_indices[level] = []
+        for bounding_area_shape, indices_by_community in zip(
+            bounding_area_shapes, nonoutlier_indices
+        ):
+            area_indices, area_communities = _concatenate_communities(
+                indices_by_community
+            )
+            selected = np.isin(area_communities, rebuilt_communities[level])
+            if not selected.any():
+                voronoi_task_indices[level].append(None)
+                continue
+            if not selected.all():
+                if len(np.unique(latlngs[area_indices], axis=0)) >= 5:
+                    selected = _delaunay_neighbors(latlngs[area_indices], selected)
+                if len(np.unique(latlngs[area_indices[selected]], axis=0)) < 5:
+                    selected[:] = True  # too few nodes for a Voronoi diagram
+            voronoi_task_indices[level].append(len(voronoi_tasks))
+            voronoi_tasks.append(
+                (
+                    list(map(tuple, latlngs[area_indices[selected]].tolist())),
+                    bounding_area_shape,
+                    np.split(
+                        area_indices[selected],
+                        np.cumsum(
+                            np.bincount(
+                                area_communities[selected], minlength=len(community_IDs)
+                            )
+                        )[:-1],
+                    ),
+                )
+            )
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        #####################
+        # Generate polygons #
+        #####################
+        voronoi_diagrams = list(
+            _map(executor, _generate_voronoi_regions, voronoi_tasks)
+        )
+        voronoi_clusters = []
+        for level in levels:
+            voronoi_clusters_by_bounding_area = [
+                voronoi_diagrams[task_index] if task_index is not None else []
+                for task_index in voronoi_task_indices[level]
+            ]
+            for i in rebuilt_communities[level]:
+                voronoi_clusters.append([])
+                for (
+                    voronoi_clusters_of_bounding_area
+                ) in voronoi_clusters_by_bounding_area:
+                    voronoi_clusters[-1] += (
+                        voronoi_clusters_of_bounding_area[i]
+                        if len(voronoi_clusters_of_bounding_area) > i
+                        else []
+                    )
+
+        ##################################
+        # Merge each community's regions #
+        ##################################
+        region_geometries = iter(
+            list(
+                _map(
+                    executor,
+                    _merge_community,
+                    voronoi_clusters,
+                    chunksize=max(1, len(voronoi_clusters) // (4 * (workers or 1))),
+                )
+            )
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    for level in levels:
+        previous = previous_regions_serialized.get(level)
+        geometries = (
+            dict(zip(previous["community_IDs"], previous["geometries"]))
+            if previous is not None
+            else {}
+        )
+        for i in rebuilt_communities[level]:
+            geometries[regions_serialized[level]["community_IDs"][i]] = next(
+                region_geometries
+            )
+        regions_serialized[level]["geometries"] = [
+            geometries[community_ID]
+            for community_ID in regions_serialized[level]["community_IDs"]
+        ]
+    return regions_serialized
@@ -0,0 +1,164 @@
+"""
+A persistent cache of the region files built from custom region models.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from ._file_utils import read_region_file_binary, write_region_file_binary
+
+# Bump whenever the build pipeline changes its output so stale entries are
+# no longer hit
+BUILD_CACHE_VERSION = 2
+
+
+def default_cache_directory() -> str:
+    return os.path.join(
+        os.environ.get(
+            "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+        ),
+        "travel_regions",
+    )
+
+
+class BuildCache:
+    """
+    A content-addressed cache of built region files. Each hierarchical level
+    of a build is stored as a binary region file named after a hash of
+    everything the build depends on, i.e. the contents of the region model
+    and bounding area files as well as the build parameters. Loading an entry
+    memory-maps it, so hits take near-constant time regardless of the size of
+    the region model.
+
+    Once the entries' combined size exceeds ``max_size``, the least recently
+    used ones are evicted.
+
+    Args:
+        directory (str, optional): Where to store the cache entries. Defaults
+            to None, i.e. ``$XDG_CACHE_HOME/travel_regions`` or
+            ``~/.cache/travel_regions``.
+        max_size (int, optional): Maximum combined size of all entries in
+            bytes. Defaults to 1 GiB.
+    """
+
+    def __init__(self, directory: str = None, max_size: int = 2 ** 30):
+        self.directory = directory or default_cache_directory()
+        self.max_size = max_size
+
+    @staticmethod
+    def _hash_file(path: str, file_hash) -> None:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                file_hash.update(chunk)
+
+    def keys(
+        self,
+        region_model: str,
+        bounding_area_paths: List[str],
+        levels: List[int],
+        z_score_threshold: int,
+        region_node_threshold: int,
+    ) -> Dict[int, str]:
+        """
+        Computes the cache keys of a build's hierarchical levels
+
+        Args:
+            region_model (str): Path to the region model
+            bounding_area_paths (List[str]): Paths to the bounding areas, in
+                the order they are passed to the build
+            levels (List[int]): The hierarchical levels being built
+            z_score_threshold (int): The build's outlier threshold
+            region_node_threshold (int): The minimum number of nodes per
+                region
+
+        Returns:
+            Dict[int, str]: The cache key of each level
+        """
+        inputs_hash = hashlib.sha256()
+        inputs_hash.update(
+            f"{BUILD_CACHE_VERSION}:{z_score_threshold}:{region_node_threshold}".encode()
+        )
+        for path in [region_model, *bounding_area_paths]:
+            self._hash_file(path, inputs_hash)
+            inputs_hash.update(b"\0")
+        keys = {}
+        for level in levels:
+            level_hash = inputs_hash.copy()
+            level_hash.update(f":{level}".encode())
+            keys[level] = level_hash.hexdigest()
+        return keys
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    @staticmethod
+    def _touch(path: str):
+        # Marks an entry as recently used. Timestamps are set explicitly since
+        # file systems may only update them at a coarse granularity.
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def get(self, key: str) -> Dict:
+        """
+        Loads a cache entry
+
+        Args:
+            key (str): The entry's key
+
+        Returns:
+            Dict: The serialized region file or None if there is no entry
+        """
+        path = self._path(key)
+        try:
+            regions_serialized = read_region_file_binary(path)
+            self._touch(path)
+        except (OSError, ValueError):
+            return None
+        return regions_serialized
+
+    def put(self, key: str, regions_serialized: Dict):
+        """
+        Stores a cache entry and evicts the least recently used ones if the
+        cache has grown too large
+
+        Args:
+            key (str): The entry's key
+            regions_serialized (Dict): The serialized region file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see
+        # partially written entries
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        os.close(file_descriptor)
+        try:
+            write_region_file_binary(temporary_path, regions_serialized)
+            os.replace(temporary_path, self._path(key))
+            self._touch(self._path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache's size no
+        longer exceeds ``max_size``
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # e.g. still mapped by another process on Windows
+            size -= entry_size
@@ -1,7 +1,15 @@
+import ast
 import csv
+import gc
+import gzip
 import json
+import re
+import struct
+from contextlib import contextmanager
+from itertools import islice
 import geopandas as gpd
-from typing import List, Dict
+import numpy as np
+from typing import Any, IO, Iterator, List, Dict, Tuple
 
 
 def read_csv(path: str) -> List[List[str]]:
@@ -39,30 +47,140 @@ def write_csv(
 ######################
 # CSV file utilities #
 ######################
-def get_max_in_col(col: int) -> int:
+class RegionModel:
     """
-    Returns the highest value in the specified column.
+    Columnar representation of a region model. Each CSV column is kept in a
+    single NumPy array, so no Python objects are held per row. Coordinates
+    are kept as the strings they're given as in the CSV since region files
+    store them verbatim.
 
     Args:
-        col (int): Column index.
+        header (List[str]): The CSV header
+        ids (np.ndarray): Node IDs
+        communities (np.ndarray): Community IDs of shape (n, number of
+            hierarchical levels)
+        countries (np.ndarray): ISO 3166-1 alpha-2 codes of the nodes'
+            countries
+        latitudes (np.ndarray): Latitudes as strings
+        longitudes (np.ndarray): Longitudes as strings
+        names (np.ndarray): Node names
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        ids: np.ndarray,
+        communities: np.ndarray,
+        countries: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        names: np.ndarray,
+    ):
+        self.header = header
+        self.ids = ids
+        self.communities = communities
+        self.countries = countries
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.names = names
+        self.latlngs = np.column_stack(
+            [latitudes.astype(np.float64), longitudes.astype(np.float64)]
+        ).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get_communities(self, level: int) -> Tuple[List[int], List[np.ndarray]]:
+        """
+        Groups the nodes by community without copying any rows
+
+        Args:
+            level (int): The community level in the region hierarchy
+
+        Returns:
+            Tuple[List[int], List[np.ndarray]]: The level's community IDs in
+                order of their first appearance, just like
+                :func:`get_communities`, and the indices of each community's
+                nodes in ascending order
+        """
+        community_IDs, first_rows, communities = np.unique(
+            self.communities[:, level - 1], return_index=True, return_inverse=True
+        )
+        order = np.argsort(first_rows)
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order))
+        communities = ranks[communities.reshape(-1)]
+        members_by_community = np.split(
+            np.argsort(communities, kind="stable"),
+            np.cumsum(np.bincount(communities, minlength=len(order)))[:-1],
+        )
+        return community_IDs[order].tolist(), members_by_community
+
+    def get_row(self, index: int) -> List[str]:
+        """
+        Reconstructs a row of the region model
+
+        Args:
+            index (int): Row index, not counting the header
+
+        Returns:
+            List[str]: The row's fields
+        """
+        return [
+            str(self.ids[index]),
+            *map(str, self.communities[index].tolist()),
+            str(self.countries[index]),
+            str(self.latitudes[index]),
+            str(self.longitudes[index]),
+            self.names[index],
+        ]
+
+
+def read_region_model(path: str, chunk_size: int = 2 ** 16) -> RegionModel:
+    """
+    Reads a region model CSV in a single pass. Rows are converted into
+    columnar arrays in chunks of ``chunk_size`` rows, so at no point are all
+    rows held as Python lists.
+
+    Args:
+        path (str): Path to the region model. Columns are expected to be the
+            node ID, one column per hierarchical level holding community IDs,
+            country code, latitude, longitude, and place name.
+        chunk_size (int, optional): Number of rows converted at once.
+            Defaults to 2 ** 16.
 
     Returns:
-        int: Maximum value in column.
+        RegionModel: The region model's columns
     """
-    with open(
-        "data/communities_-1__with_distance_multi-level_geonames_cities_7.csv",
-        newline="",
-        encoding="utf-8",
-    ) as csvfile:
+    with open(path, newline="", encoding="utf-8",) as csvfile:
         csv_reader = csv.reader(csvfile, delimiter=",")
-        max_comm1 = -1
-        for i, row in enumerate(csv_reader):
-            if i == 0:
-                continue  # skip first row (headers)
-            comm1 = int(row[col])
-            if comm1 > max_comm1:
-                max_comm1 = comm1
-        return max_comm1
+        header = next(csv_reader)
+        n_levels = len(header) - 5
+        chunks = []
+        for rows in iter(lambda: list(islice(csv_reader, chunk_size)), []):
+            columns = list(zip(*rows))
+            chunks.append(
+                (
+                    np.array(columns[0], dtype=str),
+                    np.array(columns[1:-4], dtype=np.int64).T.reshape(-1, n_levels),
+                    np.array(columns[-4], dtype=str),
+                    np.array(columns[-3], dtype=str),
+                    np.array(columns[-2], dtype=str),
+                    np.array(columns[-1], dtype=object),
+                )
+            )
+    if not chunks:
+        chunks.append(
+            (
+                np.empty(0, dtype=str),
+                np.empty((0, n_levels), dtype=np.int64),
+                np.empty(0, dtype=str),
+                np.empty(0, dtype=str),
+                np.empty(0, dtype=str),
+                np.empty(0, dtype=object),
+            )
+        )
+    return RegionModel(header, *map(np.concatenate, zip(*chunks)))
 
 
 def get_communities(
@@ -106,6 +224,609 @@ def read_geo_json(path):
         return json.load(f)["features"][0]
 
 
+def to_json_serializable(obj: Any) -> Any:
+    """
+    Converts the NumPy objects found in region files loaded from their binary
+    representation into JSON-serializable ones. Intended to be passed to
+    ``json.dump()`` as ``default``.
+
+    Args:
+        obj (Any): An object ``json`` cannot serialize natively
+
+    Returns:
+        Any: A JSON-serializable representation of ``obj``
+    """
+    if isinstance(obj, np.ndarray) and obj.dtype.names:
+        return [to_json_serializable(record) for record in obj]
+    if isinstance(obj, np.void):
+        return {name: to_json_serializable(obj[name]) for name in obj.dtype.names}
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def read_region_file(path: str) -> Dict:
+    """
+    Reads a region file, choosing the format based on the file extension. See
+    :func:`read_region_file_binary` for the binary format. JSON and GeoJSON
+    region files are parsed incrementally, one region at a time, and may be
+    gzip-compressed.
+
+    Args:
+        path (str): Path to a JSON (``.json``), GeoJSON (``.geojson``), or
+            binary (``.bin``) region file, with an additional ``.gz``
+            extension if compressed
+
+    Returns:
+        Dict: The serialized region file
+    """
+    if path.endswith(".bin"):
+        return read_region_file_binary(path)
+    with _open_text(path, "r") as f, _gc_paused():
+        reader = _JSONReader(f)
+        if _is_geojson(path):
+            return _read_region_file_geojson(reader)
+        regions_serialized = {}
+        for key in reader.members():
+            regions_serialized[key] = (
+                list(reader.elements()) if reader.peek() == "[" else reader.value()
+            )
+        return regions_serialized
+
+
+def write_region_file(path: str, regions_serialized: Dict, precision: int = None):
+    """
+    Writes a region file as compact JSON or, if ``path`` ends in ``.geojson``,
+    as a GeoJSON FeatureCollection with one feature per region. Regions are
+    encoded and written one at a time, each on its own line, rather than
+    encoding the whole file in memory first. Paths ending in ``.gz`` are
+    gzip-compressed on the fly.
+
+    Args:
+        path (str): Target location in the file system
+        regions_serialized (Dict): The serialized region file, see
+            ``TravelRegions.regions_serialized``
+        precision (int, optional): Number of decimal places to round
+            coordinates to. Defaults to None, i.e. full precision.
+    """
+    with _open_text(path, "w") as f:
+        if _is_geojson(path):
+            _write_region_file_geojson(f, regions_serialized, precision)
+            return
+        f.write("{")
+        for i, (key, value) in enumerate(regions_serialized.items()):
+            f.write(f'{"," if i else ""}\n{_dumps(key)}:')
+            if key not in ("geometries", "nodes"):
+                f.write(_dumps(value))
+                continue
+            quantize = _quantize_geometry if key == "geometries" else _quantize_nodes
+            _write_array(f, (_dumps(quantize(element, precision)) for element in value))
+        f.write("\n}\n")
+
+
+@contextmanager
+def _gc_paused():
+    # Parsed values are acyclic, but building them up piece by piece lets the
+    # cyclic garbage collector rescan them over and over, which would make
+    # incremental parsing several times slower than json.load()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def _is_geojson(path: str) -> bool:
+    return path.rsplit(".gz", 1)[0].endswith(".geojson")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=to_json_serializable)
+
+
+def _write_array(f: IO[str], encoded_elements: Iterator[str]):
+    # Writes each element of a JSON array on its own line
+    f.write("[")
+    for i, element in enumerate(encoded_elements):
+        f.write(f'{"," if i else ""}\n{element}')
+    f.write("\n]")
+
+
+def _transform_ring(ring: Any, precision: int, flip: bool = False) -> Any:
+    # Rounds a ring's coordinates and optionally swaps their order
+    if precision is None and not flip:
+        return ring
+    ring = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+    if flip:
+        ring = ring[:, ::-1]
+    return (np.round(ring, precision) if precision is not None else ring).tolist()
+
+
+def _quantize_geometry(geometry: Dict, precision: int) -> Dict:
+    if precision is None or not geometry:
+        return geometry
+    if geometry["type"] == "polygon":
+        return {
+            "type": "polygon",
+            "geometry": _transform_ring(geometry["geometry"], precision),
+        }
+    return {
+        "type": "multipolygon",
+        "geometry": [_transform_ring(ring, precision) for ring in geometry["geometry"]],
+    }
+
+
+def _quantize_nodes(nodes: List[Dict], precision: int) -> List[Dict]:
+    if precision is None:
+        return nodes
+    if isinstance(nodes, np.ndarray):
+        nodes = to_json_serializable(nodes)
+    return [
+        {
+            **node,
+            "latlng": [
+                round(float(coordinate), precision) for coordinate in node["latlng"]
+            ],
+        }
+        for node in nodes
+    ]
+
+
+def _geometry_to_geojson(geometry: Dict, precision: int) -> Dict:
+    # GeoJSON orders coordinates as (lng, lat), region files as (lat, lng)
+    if not geometry:
+        return None
+    if geometry["type"] == "polygon":
+        return {
+            "type": "Polygon",
+            "coordinates": [_transform_ring(geometry["geometry"], precision, True)],
+        }
+    return {
+        "type": "MultiPolygon",
+        "coordinates": [
+            [_transform_ring(ring, precision, True)] for ring in geometry["geometry"]
+        ],
+    }
+
+
+def _geojson_to_geometry(geojson: Dict) -> Dict:
+    if not geojson:
+        return {}
+    if geojson["type"] == "Polygon":
+        return {
+            "type": "polygon",
+            "geometry": _transform_ring(geojson["coordinates"][0], None, True),
+        }
+    return {
+        "type": "multipolygon",
+        "geometry": [
+            _transform_ring(polygon[0], None, True)
+            for polygon in geojson["coordinates"]
+        ],
+    }
+
+
+def _write_region_file_geojson(
+    f: IO[str], regions_serialized: Dict, precision: int = None
+):
+    # Per-region entries become features, all others foreign members of the
+    # FeatureCollection
+    f.write('{"type":"FeatureCollection"')
+    for key, value in regions_serialized.items():
+        if key not in ("community_IDs", "geometries", "nodes"):
+            f.write(f",\n{_dumps(key)}:{_dumps(value)}")
+    f.write(',\n"features":')
+    _write_array(
+        f,
+        (
+            _dumps(
+                {
+                    "type": "Feature",
+                    "geometry": _geometry_to_geojson(geometry, precision),
+                    "properties": {
+                        "community_id": community_ID,
+                        "nodes": _quantize_nodes(nodes, precision),
+                    },
+                }
+            )
+            for community_ID, geometry, nodes in zip(
+                regions_serialized["community_IDs"],
+                regions_serialized["geometries"],
+                regions_serialized["nodes"],
+            )
+        ),
+    )
+    f.write("\n}\n")
+
+
+def _read_region_file_geojson(reader: "_JSONReader") -> Dict:
+    regions_serialized = {}
+    for key in reader.members():
+        if key != "features":
+            value = reader.value()
+            if key != "type":
+                regions_serialized[key] = value
+            continue
+        community_IDs = regions_serialized["community_IDs"] = []
+        geometries = regions_serialized["geometries"] = []
+        nodes = regions_serialized["nodes"] = []
+        for feature in reader.elements():
+            community_IDs.append(feature["properties"]["community_id"])
+            geometries.append(_geojson_to_geometry(feature["geometry"]))
+            nodes.append(feature["properties"]["nodes"])
+    return regions_serialized
+
+
+# Characters that can continue a number
+_NUMBER_TAIL = "0123456789.eE+-"
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _JSONReader:
+    """
+    Parses a JSON document from a text stream piece by piece, so that the
+    elements of large arrays can be processed as soon as they've been read
+    rather than after the whole document has been loaded. Values are decoded
+    with ``json``'s C decoder, which is only fed chunks of the stream.
+
+    Args:
+        f (IO[str]): The text stream to parse
+        chunk_size (int, optional): Number of characters to read at a time.
+            Defaults to 1 MiB.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = 2 ** 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Drops everything consumed so far and appends the next chunk
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+    def peek(self) -> str:
+        """
+        Returns the next non-whitespace character without consuming it, or an
+        empty string at the end of the stream
+        """
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position : self.position + 1]
+            self._fill()
+
+    def _expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of '{characters}' but found '{character}'")
+        self.position += 1
+        return character
+
+    def value(self) -> Any:
+        """
+        Reads the next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number cut off by the end of the buffer, e.g. "1." of
+                # "1.5", decodes fine but continues in the next chunk
+                if self.eof or (
+                    end < len(self.buffer) and self.buffer[end] not in _NUMBER_TAIL
+                ):
+                    self.position = end
+                    return value
+            self._fill()
+
+    def members(self) -> Iterator[str]:
+        """
+        Reads an object, yielding the key of each member. The member's value
+        has to be read with :func:`value` or :func:`elements` before advancing.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def elements(self) -> Iterator[Any]:
+        """
+        Reads an array, yielding its elements one at a time
+        """
+        self._expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(",]") == "]":
+                return
+
+
+#############################
+# Binary region file format #
+#############################
+# Layout: the magic bytes, a little-endian uint32 format version, and a uint32
+# header length are followed by a UTF-8 JSON header and, starting at the next
+# 8-byte boundary, the raw array data. The header holds all of the region
+# file's small entries (level, community IDs, bounding areas, outliers, ...)
+# as well as each array's dtype, shape, and offset into the data section.
+REGION_FILE_MAGIC = b"TRREGION"
+REGION_FILE_VERSION = 1
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def write_region_file_binary(path: str, regions_serialized: Dict):
+    """
+    Writes a region file in a columnar binary format that can be memory-mapped
+    when read back. Coordinates of all region geometries are stored in a
+    single float64 buffer, with ring, polygon, and region offset arrays
+    delimiting the individual geometries. Region nodes are stored as one
+    record array with a region offset array.
+
+    Args:
+        path (str): Target location in the file system
+        regions_serialized (Dict): The serialized region file, see
+            ``TravelRegions.regions_serialized``
+    """
+    region_types = []
+    region_offsets = [0]
+    polygon_offsets = [0]
+    ring_offsets = [0]
+    coordinates = [np.empty((0, 2))]
+    for geometry in regions_serialized["geometries"]:
+        if not geometry:
+            region_types.append(0)
+            polygons = []
+        elif geometry["type"] == "polygon":
+            region_types.append(1)
+            polygons = [geometry["geometry"]]
+        else:
+            region_types.append(2)
+            polygons = geometry["geometry"]
+        for polygon in polygons:
+            ring = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+            coordinates.append(ring)
+            ring_offsets.append(ring_offsets[-1] + len(ring))
+            polygon_offsets.append(polygon_offsets[-1] + 1)  # exterior rings only
+        region_offsets.append(region_offsets[-1] + len(polygons))
+
+    region_nodes = [
+        to_json_serializable(nodes) if isinstance(nodes, np.ndarray) else nodes
+        for nodes in regions_serialized["nodes"]
+    ]
+    node_ids = [str(node.get("id", "")) for nodes in region_nodes for node in nodes]
+    node_records = np.zeros(
+        len(node_ids),
+        dtype=[
+            ("id", f"U{max(map(len, node_ids), default=1)}"),
+            ("latlng", "f8", (2,)),
+        ],
+    )
+    node_records["id"] = node_ids
+    node_records["latlng"] = np.array(
+        [node["latlng"] for nodes in region_nodes for node in nodes], dtype=np.float64
+    ).reshape(-1, 2)
+
+    arrays = {
+        "region_types": np.array(region_types, dtype=np.uint8),
+        "region_offsets": np.array(region_offsets, dtype=np.int64),
+        "polygon_offsets": np.array(polygon_offsets, dtype=np.int64),
+        "ring_offsets": np.array(ring_offsets, dtype=np.int64),
+        "coordinates": np.concatenate(coordinates),
+        "node_offsets": np.cumsum(
+            [0] + [len(nodes) for nodes in region_nodes], dtype=np.int64
+        ),
+        "nodes": node_records,
+    }
+    header = {
+        "metadata": {
+            key: value
+            for key, value in regions_serialized.items()
+            if key not in ("geometries", "nodes")
+        },
+        "arrays": {},
+    }
+    offsets = {}
+    offset = 0
+    for name, array in arrays.items():
+        offsets[name] = offset
+        header["arrays"][name] = {
+            "descr": repr(np.lib.format.dtype_to_descr(array.dtype)),
+            "shape": array.shape,
+            "offset": offset,
+        }
+        offset = _align(offset + array.nbytes)
+    header = json.dumps(header, default=to_json_serializable).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(REGION_FILE_MAGIC)
+        f.write(struct.pack("<II", REGION_FILE_VERSION, len(header)))
+        f.write(header)
+        data_start = _align(f.tell())
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + offsets[name] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_region_file_binary(path: str) -> Dict:
+    """
+    Reads a region file written by :func:`write_region_file_binary`. All
+    arrays are memory-mapped rather than read into memory, and geometries and
+    nodes are returned as views into them, so no Python objects are created
+    per coordinate or node.
+
+    Args:
+        path (str): Path to a binary region file
+
+    Returns:
+        Dict: The serialized region file. Polygons are given as NumPy arrays
+            of shape (n, 2) and each region's nodes as a record array with
+            the fields ``id`` and ``latlng``.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(REGION_FILE_MAGIC)) != REGION_FILE_MAGIC:
+            raise ValueError(f"{path} is not a binary region file")
+        version, header_length = struct.unpack("<II", f.read(8))
+        if version != REGION_FILE_VERSION:
+            raise ValueError(f"Unsupported region file version {version}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = _align(len(REGION_FILE_MAGIC) + 8 + header_length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.lib.format.descr_to_dtype(ast.literal_eval(spec["descr"]))
+        shape = tuple(spec["shape"])
+        if not np.prod(shape):
+            arrays[name] = np.empty(shape, dtype=dtype)  # mmap can't map 0 bytes
+            continue
+        arrays[name] = np.memmap(
+            path,
+            dtype=dtype,
+            mode="r",
+            offset=data_start + spec["offset"],
+            shape=shape,
+        )
+
+    region_types = arrays["region_types"]
+    region_offsets = arrays["region_offsets"].tolist()
+    polygon_offsets = arrays["polygon_offsets"].tolist()
+    ring_offsets = arrays["ring_offsets"].tolist()
+    node_offsets = arrays["node_offsets"].tolist()
+    coordinates = arrays["coordinates"]
+    geometries = []
+    nodes = []
+    for i, region_type in enumerate(region_types.tolist()):
+        polygons = [
+            coordinates[ring_offsets[ring] : ring_offsets[ring + 1]]
+            for ring in polygon_offsets[region_offsets[i] : region_offsets[i + 1]]
+        ]
+        if region_type == 0:
+            geometries.append({})
+        elif region_type == 1:
+            geometries.append({"type": "polygon", "geometry": polygons[0]})
+        else:
+            geometries.append({"type": "multipolygon", "geometry": polygons})
+        nodes.append(arrays["nodes"][node_offsets[i] : node_offsets[i + 1]])
+
+    regions_serialized = dict(header["metadata"])
+    regions_serialized["geometries"] = geometries
+    regions_serialized["nodes"] = nodes
+    return regions_serialized
+
+
+ADMIN_REGION_STORE_MAGIC = b"TRADMINS"
+ADMIN_REGION_STORE_VERSION = 1
+
+
+def write_admin_region_store(path: str, geometries: Dict[str, Dict[str, bytes]]):
+    """
+    Writes a store of administrative region geometries from which a single
+    country's geometries can be read without touching the others'. Each
+    country's geometries are stored as consecutive WKB blobs, and a header
+    indexes their names, position, and sizes by country code.
+
+    Args:
+        path (str): Target location in the file system
+        geometries (Dict[str, Dict[str, bytes]]): For each country code, a
+            name:WKB mapping of the geometries to store
+    """
+    index = {}
+    offset = 0
+    for country, country_geometries in geometries.items():
+        sizes = [len(wkb) for wkb in country_geometries.values()]
+        index[country] = {
+            "names": list(country_geometries),
+            "offset": offset,
+            "sizes": sizes,
+        }
+        offset += sum(sizes)
+    header = json.dumps(index).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(ADMIN_REGION_STORE_MAGIC)
+        f.write(struct.pack("<II", ADMIN_REGION_STORE_VERSION, len(header)))
+        f.write(header)
+        for country_geometries in geometries.values():
+            for wkb in country_geometries.values():
+                f.write(wkb)
+
+
+def read_admin_region_store_index(path: str) -> Dict[str, Dict]:
+    """
+    Reads the index of a store written by :func:`write_admin_region_store`
+
+    Args:
+        path (str): Path to an administrative region store
+
+    Returns:
+        Dict[str, Dict]: For each country code, the names, absolute file
+            offset, and sizes of its geometries, to be passed to
+            :func:`read_admin_region_store`
+    """
+    with open(path, "rb") as f:
+        if f.read(len(ADMIN_REGION_STORE_MAGIC)) != ADMIN_REGION_STORE_MAGIC:
+            raise ValueError(f"{path} is not an administrative region store")
+        version, header_length = struct.unpack("<II", f.read(8))
+        if version != ADMIN_REGION_STORE_VERSION:
+            raise ValueError(
+                f"Unsupported administrative region store version {version}"
+            )
+        index = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = len(ADMIN_REGION_STORE_MAGIC) + 8 + header_length
+    for entry in index.values():
+        entry["offset"] += data_start
+    return index
+
+
+def read_admin_region_store(path: str, entry: Dict) -> Dict[str, bytes]:
+    """
+    Reads a single country's geometries from an administrative region store
+
+    Args:
+        path (str): Path to an administrative region store
+        entry (Dict): The country's entry in the store's index, see
+            :func:`read_admin_region_store_index`
+
+    Returns:
+        Dict[str, bytes]: The country's geometries as a name:WKB mapping
+    """
+    with open(path, "rb") as f:
+        f.seek(entry["offset"])
+        data = f.read(sum(entry["sizes"]))
+    geometries = {}
+    offset = 0
+    for name, size in zip(entry["names"], entry["sizes"]):
+        geometries[name] = data[offset : offset + size]
+        offset += size
+    return geometries
+
+
 #######################
 # Shapefile utilities #
 #######################
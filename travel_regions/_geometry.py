@@ -3,12 +3,14 @@ Functions for geometric operations including outlier detection, polygon generati
 """
 # http://blog.thehumangeo.com/2014/05/12/drawing-boundaries-in-python/
 from typing import Dict, List, Tuple, Union
-from haversine import haversine
+from haversine import haversine, haversine_vector
 from scipy import stats
 from functools import reduce
 from math import sqrt
 import operator
+import struct
 import shapely.geometry as geometry
+from shapely import vectorized
 import matplotlib.pyplot as pl
 import alphashape
 import time
@@ -16,7 +18,8 @@ import numpy as np
 
 from typing import Dict, List, Tuple
 from descartes import PolygonPatch
-from geovoronoi import voronoi_regions_from_coords, coords_to_points, points_to_coords
+from geovoronoi import voronoi_regions_from_coords
+from shapely.geos import WKBWriter, lgeos
 from shapely.ops import cascaded_union
 
 
@@ -47,18 +50,13 @@ def generate_constrained_voronoi_diagram(
     Returns:
         Union[List[List[geometry.Polygon]], List[geometry.Polygon]]: The Voronoi diagram as a list of Shapely polygons. If `communities` is provided, the generated Voronoi regions will further be organized and returned as a list of communities of the form List[List[geometry.Polygon]], where each community contains the Voronoi regions surrounding the nodes that form it.
     """
-    points = np.array(points)
+    points = np.array(points, dtype=np.float64).reshape(-1, 2)
 
-    coords = coords_to_points(points)
     # use only the points inside the geographic area
-    contained_points = []
-    for p in coords:  # converts to shapely Point
-        if p.within(containing_area):
-            contained_points.append(p)
-    if len(contained_points) < 5:
+    points = points[vectorized.contains(containing_area, points[:, 0], points[:, 1])]
+    if len(points) < 5:
         print("Bounding area must contain at least 4 nodes from region model")
         return []
-    points = points_to_coords(contained_points)
     poly_shapes, pts, poly_to_pt_assignments = voronoi_regions_from_coords(
         points, containing_area
     )
@@ -92,13 +90,148 @@ def merge_regions(
         # cascaded_union() turns empty lists into objects of type GeometryCollection in the
         # list of merged regions, which later raise an error in TravelRegions.extract_geometries
         if community_regions:
-            merged_region = cascaded_union(community_regions)
+            merged_region = dissolve_tiling(community_regions)
+            if merged_region is None:
+                merged_region = cascaded_union(community_regions)
             merged_regions.append(merged_region)
         else:
             merged_regions.append([])
     return merged_regions
 
 
+_wkb_writer = WKBWriter(lgeos)
+
+
+def _read_wkb_polygon(wkb: bytes, offset: int) -> Tuple[List[np.ndarray], int]:
+    byte_order = "<" if wkb[offset] == 1 else ">"
+    geometry_type, ring_count = struct.unpack_from(byte_order + "II", wkb, offset + 1)
+    if geometry_type != 3:
+        raise ValueError(f"Unsupported WKB geometry type {geometry_type}")
+    offset += 9
+    rings = []
+    for _ in range(ring_count):
+        (point_count,) = struct.unpack_from(byte_order + "I", wkb, offset)
+        rings.append(
+            np.frombuffer(
+                wkb, dtype=byte_order + "f8", count=2 * point_count, offset=offset + 4
+            ).reshape(-1, 2)
+        )
+        offset += 4 + 16 * point_count
+    return rings, offset
+
+
+def _read_wkb_polygons(wkb: bytes) -> List[List[np.ndarray]]:
+    # Reads the rings of a Polygon or of each of a MultiPolygon's parts from
+    # its WKB representation, which is much faster than going through Shapely's
+    # coordinate sequences one ring at a time
+    byte_order = "<" if wkb[0] == 1 else ">"
+    geometry_type, count = struct.unpack_from(byte_order + "II", wkb, 1)
+    if geometry_type == 3:
+        return [_read_wkb_polygon(wkb, 0)[0]]
+    if geometry_type != 6:
+        raise ValueError(f"Unsupported WKB geometry type {geometry_type}")
+    polygons = []
+    offset = 9
+    for _ in range(count):
+        rings, offset = _read_wkb_polygon(wkb, offset)
+        polygons.append(rings)
+    return polygons
+
+
+def dissolve_tiling(
+    polygons: List[geometry.Polygon],
+) -> Union[geometry.MultiPolygon, geometry.Polygon, None]:
+    """
+    Unifies polygons that tile an area without overlapping, such as Voronoi regions, by cancelling out the edges neighboring polygons share and tracing the remaining edges into rings. This avoids the overlay operations of cascaded_union(), which are unnecessary for tilings.
+
+    Args:
+        polygons (List[geometry.Polygon]): Polygons or MultiPolygons whose shared edges have identical vertices.
+
+    Returns:
+        Union[geometry.MultiPolygon, geometry.Polygon, None]: The unified region or None if the polygons' outline couldn't be traced unambiguously, e.g. because shared edges don't line up exactly or parts touch at a single vertex. Such polygons should be unified with cascaded_union() instead.
+    """
+    rings = []
+    is_exterior = []
+    for polygon in polygons:
+        try:
+            parts = _read_wkb_polygons(_wkb_writer.write(polygon))
+        except ValueError:
+            return None
+        for part in parts:
+            rings += part
+            is_exterior += [True] + [False] * (len(part) - 1)
+    lengths = np.array([len(ring) for ring in rings])
+    if len(rings) == 0 or lengths.min() < 4:
+        return None
+    points = np.concatenate(rings) + 0.0  # turns -0.0 into 0.0
+    edge_starts = np.ones(len(points), dtype=bool)
+    edge_starts[np.cumsum(lengths) - 1] = False  # rings are closed
+    edge_starts = np.flatnonzero(edge_starts)
+    edges = np.hstack([points[edge_starts], points[edge_starts + 1]])
+
+    # Orient exteriors counterclockwise and interiors clockwise, so that an
+    # edge shared by two polygons occurs once in each direction
+    ring_of_edge = np.repeat(np.arange(len(rings)), lengths - 1)
+    signed_areas = np.bincount(
+        ring_of_edge,
+        weights=edges[:, 0] * edges[:, 3] - edges[:, 2] * edges[:, 1],
+        minlength=len(rings),
+    )
+    flipped = ((signed_areas > 0) != np.array(is_exterior))[ring_of_edge]
+    edges[flipped] = edges[flipped][:, [2, 3, 0, 1]]
+    edge_keys = np.ascontiguousarray(edges).view(np.dtype((np.void, 32))).ravel()
+    reversed_edge_keys = (
+        np.ascontiguousarray(edges[:, [2, 3, 0, 1]])
+        .view(np.dtype((np.void, 32)))
+        .ravel()
+    )
+    outline = edges[~np.isin(edge_keys, reversed_edge_keys)]
+
+    # Trace the outline's edges into rings
+    next_points = {}
+    for x_start, y_start, x_end, y_end in outline.tolist():
+        if (x_start, y_start) in next_points:
+            return None  # ambiguous, multiple outline edges start here
+        next_points[(x_start, y_start)] = (x_end, y_end)
+    exteriors = []
+    holes = []
+    while next_points:
+        start, point = next_points.popitem()
+        ring = [start, point]
+        while point != start:
+            point = next_points.pop(point, None)
+            if point is None:
+                return None  # open outline
+            ring.append(point)
+        x, y = np.array(ring).T
+        signed_area = np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])
+        # Like cascaded_union(), output exteriors clockwise and holes
+        # counterclockwise
+        (exteriors if signed_area > 0 else holes).append(geometry.Polygon(ring[::-1]))
+
+    # Assign each hole to the smallest exterior surrounding it
+    exterior_holes = [[] for _ in exteriors]
+    for hole in holes:
+        surrounding = [
+            i for i, exterior in enumerate(exteriors) if exterior.contains(hole)
+        ]
+        if not surrounding:
+            return None
+        exterior_holes[min(surrounding, key=lambda i: exteriors[i].area)].append(
+            hole.exterior.coords
+        )
+    merged_polygons = [
+        geometry.Polygon(exterior.exterior.coords, interiors)
+        for exterior, interiors in zip(exteriors, exterior_holes)
+    ]
+    merged_region = (
+        merged_polygons[0]
+        if len(merged_polygons) == 1
+        else geometry.MultiPolygon(merged_polygons)
+    )
+    return merged_region if merged_region.is_valid else None
+
+
 def plot_polygon(polygon, figure):
     ax = figure.add_subplot(111)
     margin = 0.3
@@ -120,6 +253,26 @@ def geometry_to_shapely(serialized_geometry: Dict):
     )
 
 
+def simplify_geometry(
+    shape: Union[geometry.Polygon, geometry.MultiPolygon], tolerance: float
+) -> Dict:
+    """
+    Simplifies a geometry without changing its topology, i.e. without letting
+    its polygons intersect themselves or each other, and serializes it
+
+    Args:
+        shape (Union[geometry.Polygon, geometry.MultiPolygon]): The geometry to
+            simplify
+        tolerance (float): No point of the simplified geometry's boundary lies
+            farther than this from the original boundary, in degrees
+
+    Returns:
+        Dict: The simplified geometry, serialized like by
+            :func:`extract_geometries`
+    """
+    return extract_geometries(shape.simplify(tolerance, preserve_topology=True))[0]
+
+
 # FIXME Rename to shapely_to_geometry()
 def extract_geometries(*shapely_polygons) -> List[Dict]:
     """
@@ -152,18 +305,6 @@ def extract_geometries(*shapely_polygons) -> List[Dict]:
     return geometries
 
 
-def classify_points(
-    points: List[List[float]],
-    communities: List[Union[geometry.Polygon, geometry.MultiPolygon]],
-) -> Dict[int, np.array]:
-    classifications = {i: [] for i, _ in enumerate(communities)}
-    for p in coords_to_points(points):
-        for i, community in enumerate(communities):
-            if p.within(community):
-                classifications[i].append(points_to_coords([p])[0])
-    return classifications
-
-
 def detect_outliers_z_score(data, threshold=3) -> List[Tuple[int, float]]:
     centroid = find_centroid(data)
     distances_from_center = [haversine(point, centroid) for point in data]
@@ -175,6 +316,37 @@ def detect_outliers_z_score(data, threshold=3) -> List[Tuple[int, float]]:
     return outliers
 
 
+def detect_outliers_z_score_grouped(
+    latlngs: np.ndarray, groups: np.ndarray, threshold=3
+) -> np.ndarray:
+    """
+    Vectorized version of :func:`detect_outliers_z_score` that detects the
+    outliers of many groups of points, e.g. communities, at once.
+
+    Args:
+        latlngs (np.ndarray): Coordinates of all points as an array of shape
+            (n, 2)
+        groups (np.ndarray): Group index of each point
+        threshold (int, optional): The z-score above which a point's distance
+            from its group's centroid makes it an outlier. Defaults to 3.
+
+    Returns:
+        np.ndarray: A boolean mask marking the outliers
+    """
+    counts = np.bincount(groups)
+    centroids = np.column_stack(
+        [np.bincount(groups, weights=latlngs[:, i]) / counts for i in range(2)]
+    )
+    distances_from_center = haversine_vector(latlngs, centroids[groups])
+    mean_distances = np.bincount(groups, weights=distances_from_center) / counts
+    deviations = distances_from_center - mean_distances[groups]
+    standard_deviations = np.sqrt(np.bincount(groups, weights=deviations ** 2) / counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_scores = deviations / standard_deviations[groups]
+    # Groups without any spread have no outliers, just like scipy's NaN z-scores
+    return (np.abs(z_scores) > threshold) & (standard_deviations[groups] > 0)
+
+
 def find_centroid(data):
     x, y = zip(*data)
     size = len(x)
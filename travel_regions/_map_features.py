@@ -1,45 +1,168 @@
 """
-Defines the classes Region and Node.
+Defines the classes Region and Node as well as NodeStore, which holds the data
+of all nodes.
 """
 from typing import *
 
-from shapely.geometry import Polygon
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.prepared import PreparedGeometry, prep
 
 from collections import Counter
+from functools import cached_property, lru_cache
 
+import numpy as np
 import pycountry
 from pycountry_convert import country_alpha2_to_continent_code
 
+from ._geometry import geometry_to_shapely, simplify_geometry
+
+
+@lru_cache(maxsize=None)
+def get_country_name(country: str) -> Optional[str]:
+    """
+    Resolves an ISO 3166-1 alpha-2 code to the country's name. Results are
+    cached, so each distinct code is only looked up once.
+
+    Args:
+        country (str): Two-letter country code
+
+    Returns:
+        Optional[str]: The country's name or None if the code is unknown
+    """
+    country = pycountry.countries.get(alpha_2=f"{country}")
+    return country.name if country is not None else None
+
+
+@lru_cache(maxsize=None)
+def get_continent_code(country: str) -> Optional[str]:
+    """
+    Resolves an ISO 3166-1 alpha-2 code to the code of the continent the
+    country is on. Results are cached, so each distinct code is only looked up
+    once.
+
+    Args:
+        country (str): Two-letter country code
+
+    Returns:
+        Optional[str]: One of SA, NA, EU, AS, AF, OC, or AN, or None if the
+            code is unknown
+    """
+    try:
+        return country_alpha2_to_continent_code(country)
+    except KeyError:
+        return {"EH": "AF", "VA": "EU", "PN": "OC"}.get(country)
+
+
+CONTINENT_NAMES = {
+    "SA": "South America",
+    "NA": "North America",
+    "EU": "Europe",
+    "AS": "Asia",
+    "AF": "Africa",
+    "OC": "Oceania",
+    "AN": "Antarctica",
+}
+
+
+class NodeStore:
+    """
+    Columnar storage for the nodes of a region model. Node attributes are kept
+    in NumPy arrays, which allows filtering nodes in a vectorized manner.
+    Continents are resolved once per distinct country.
+
+    Args:
+        ids (List[str]): Node IDs
+        names (List[str]): Node names
+        latlngs (List[Tuple[float, float]]): Node coordinates
+        countries (List[str]): ISO 3166-1 alpha-2 codes of the nodes' countries
+    """
 
-class Node:
     def __init__(
-        self, id: str, name: str, latlng: Tuple[float, float], country: str,
+        self,
+        ids: List[str],
+        names: List[str],
+        latlngs: List[Tuple[float, float]],
+        countries: List[str],
     ):
-        self.id = id
-        self.name = name
-        self.latlng = latlng
-        self.country = country
-        continent_codes = {
-            "SA": "South America",
-            "NA": "North America",
-            "EU": "Europe",
-            "AS": "Asia",
-            "AF": "Africa",
-            "OC": "Oceania",
-            "AN": "Antarctica",
+        self.ids = np.array(ids, dtype=str)
+        # Names vary widely in length, so they're kept as references rather
+        # than padded to the longest one
+        self.names = np.array(names, dtype=object)
+        self.latlngs = np.array(latlngs, dtype=np.float64).reshape(-1, 2)
+        self.countries = np.array(countries, dtype="U2")
+        distinct_countries, inverse = np.unique(self.countries, return_inverse=True)
+        self.continents = np.array(
+            [get_continent_code(country) or "" for country in distinct_countries],
+            dtype="U2",
+        )[inverse]
+        # For each level, the index of each node's region in ``regions``
+        # (-1 if the node belongs to no region on that level)
+        self.region_indices: Dict[int, np.ndarray] = {}
+        self.regions: Dict[int, List["Region"]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def assign_regions(self, level: int, regions: List["Region"]):
+        """
+        Records which of a hierarchical level's regions each node belongs to
+
+        Args:
+            level (int): Hierarchical level
+            regions (List[Region]): All regions of the level
+        """
+        region_indices = np.full(len(self), -1, dtype=np.int32)
+        for i, region in enumerate(regions):
+            region_indices[[node.index for node in region.nodes]] = i
+        self.region_indices[level] = region_indices
+        self.regions[level] = regions
+
+
+class Node:
+    """
+    A lightweight view of a single node in a :class:`NodeStore`
+
+    Args:
+        store (NodeStore): The store holding the node's data
+        index (int): The node's position in ``store``
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: NodeStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self) -> str:
+        return str(self.store.ids[self.index])
+
+    @property
+    def name(self) -> str:
+        return str(self.store.names[self.index])
+
+    @property
+    def latlng(self) -> Tuple[float, float]:
+        return tuple(self.store.latlngs[self.index].tolist())
+
+    @property
+    def country(self) -> str:
+        return str(self.store.countries[self.index])
+
+    @property
+    def continent(self) -> Optional[str]:
+        return CONTINENT_NAMES.get(str(self.store.continents[self.index]))
+
+    @property
+    def regions(self) -> Dict[int, "Region"]:
+        """
+        The regions containing the node, keyed by hierarchical level
+        """
+        return {
+            level: self.store.regions[level][region_indices[self.index]]
+            for level, region_indices in self.store.region_indices.items()
+            if region_indices[self.index] >= 0
         }
-        try:
-            self.continent = continent_codes[
-                country_alpha2_to_continent_code(self.country)
-            ]
-        except KeyError:
-            try:
-                self.continent = continent_codes[
-                    {"EH": "AF", "VA": "EU", "PN": "OC"}[self.country]
-                ]
-            except KeyError:
-                self.continent = None
-        self.regions: Dict[int, Region] = {}
 
 
 class Region:
@@ -54,11 +177,86 @@ class Region:
         self.community_id = community_id
         self.geometry = geometry
         self.id = self.generate_id()
+        self.key = (level, community_id)
+        self.index: int = None  # position among the regions of its level
         self.nodes = nodes
-        for node in nodes:
-            node.regions[level] = self
+        # Linked by TravelRegions once all levels are loaded
+        self.parent: "Region" = None
+        self.children: List["Region"] = []
+        self._simplified_geometries: Dict[float, Dict] = {}
+        # Number of nodes per country code, computed once so that country
+        # queries don't have to revisit the region's nodes
+        self.country_code_counts = Counter(node.country for node in nodes)
         self.countries = list(self.get_countries().keys())
 
+    @cached_property
+    def shape(self) -> Union[Polygon, MultiPolygon]:
+        """
+        The region's geometry as a Shapely Polygon or MultiPolygon. It is built
+        from the serialized geometry on first access and cached afterwards.
+        """
+        return geometry_to_shapely(self.geometry)
+
+    @cached_property
+    def prepared_shape(self) -> PreparedGeometry:
+        """
+        A prepared version of :attr:`shape` for fast repeated predicate tests
+        """
+        return prep(self.shape)
+
+    @cached_property
+    def polygons(self) -> List[Polygon]:
+        """
+        The individual polygons making up :attr:`shape`
+        """
+        return (
+            list(self.shape.geoms)
+            if self.geometry["type"] == "multipolygon"
+            else [self.shape]
+        )
+
+    @cached_property
+    def prepared_polygons(self) -> List[PreparedGeometry]:
+        """
+        Prepared versions of :attr:`polygons`
+        """
+        return [prep(polygon) for polygon in self.polygons]
+
+    @cached_property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """
+        The region's bounding box as (min_x, min_y, max_x, max_y)
+        """
+        return self.shape.bounds
+
+    @cached_property
+    def area(self) -> float:
+        """
+        The region's area
+        """
+        return self.shape.area
+
+    def get_simplified_geometry(self, tolerance: float) -> Dict:
+        """
+        Returns a simplified version of :attr:`geometry` with far fewer
+        vertices, e.g. for display at coarser zoom levels. Each tolerance's
+        version is computed once and cached. Regions are simplified
+        independently, so neighboring regions' borders may no longer line up
+        exactly.
+
+        Args:
+            tolerance (float): No point of the simplified boundary lies farther
+                than this from the original boundary, in degrees
+
+        Returns:
+            Dict: The simplified geometry, serialized like :attr:`geometry`
+        """
+        if tolerance not in self._simplified_geometries:
+            self._simplified_geometries[tolerance] = simplify_geometry(
+                self.shape, tolerance
+            )
+        return self._simplified_geometries[tolerance]
+
     def get_countries(self, threshold: int = 1) -> Dict[str, int]:
         """
         Returns countries with a minimum number of cities contained within the
@@ -71,12 +269,11 @@ class Region:
         Returns: Dict[str, int]: The countries fulfilling the threshold along
             with how many of their cities are in the region
         """
-        countries = []
-        for node in self.nodes:
-            country = pycountry.countries.get(alpha_2=f"{node.country}")
+        country_counts = Counter()
+        for country, count in self.country_code_counts.items():
+            country = get_country_name(country)
             if country != None:
-                countries.append(country.name)
-        country_counts = Counter(countries)
+                country_counts[country] += count
         country_counts = list(
             filter(
                 lambda country_count: country_count[1] >= threshold,
@@ -104,50 +301,54 @@ class Region:
         regions = list(regions)
         regions.remove(self)
         neighboring_regions = set()
-        if self.geometry["type"] == "polygon":
-            ego_region_polygon = Polygon(self.geometry["geometry"])
-            for candidate_region in regions:
-                if candidate_region.geometry["type"] == "polygon":
-                    candidate_region_polygon = Polygon(
-                        candidate_region.geometry["geometry"]
-                    )
-                    if ego_region_polygon.touches(candidate_region_polygon):
-                        neighboring_regions.add(candidate_region)
-                elif candidate_region.geometry["type"] == "multipolygon":
-                    for region_polygon in [
-                        Polygon(geometry)
-                        for geometry in candidate_region.geometry["geometry"]
-                    ]:
-                        if ego_region_polygon.touches(region_polygon):
-                            neighboring_regions.add(candidate_region)
-        elif self.geometry["type"] == "multipolygon":
-            for ego_region_polygon in [
-                Polygon(geometry) for geometry in self.geometry["geometry"]
-            ]:
-                for candidate_region in regions:
-                    if candidate_region.geometry["type"] == "polygon":
-                        candidate_region_polygon = Polygon(
-                            candidate_region.geometry["geometry"]
-                        )
-                        if ego_region_polygon.touches(candidate_region_polygon):
-                            neighboring_regions.add(candidate_region)
-                    else:
-                        for region_polygon in [
-                            Polygon(geometry)
-                            for geometry in candidate_region.geometry["geometry"]
-                        ]:
-                            if ego_region_polygon.touches(region_polygon):
-                                neighboring_regions.add(candidate_region)
+        min_x, min_y, max_x, max_y = self.bounds
+        for candidate_region in regions:
+            candidate_min_x, candidate_min_y, candidate_max_x, candidate_max_y = (
+                candidate_region.bounds
+            )
+            if (
+                candidate_min_x > max_x
+                or candidate_max_x < min_x
+                or candidate_min_y > max_y
+                or candidate_max_y < min_y
+            ):
+                continue  # bounding boxes are disjoint, so the geometries are too
+            if any(
+                ego_region_polygon.touches(region_polygon)
+                for ego_region_polygon in self.prepared_polygons
+                for region_polygon in candidate_region.polygons
+            ):
+                neighboring_regions.add(candidate_region)
         return neighboring_regions
 
     def get_parent(self) -> "Region":
-        # TODO finds this region's parent
-        pass
+        """
+        Returns the region on the next level up that this region's community
+        belongs to, i.e. the region most of the community's nodes belong to on
+        the closest coarser level that was loaded
+
+        Returns:
+            Region: The region's parent or None if it is on the top level or
+                its parent's community didn't make it into the model
+        """
+        return self.parent
 
     def get_children(self) -> Set["Region"]:
-        # TODO finds the regions on the next level down that are "contained" within this region
-        pass
+        """
+        Returns the regions on the next level down whose parent this region is.
+        See :func:`get_parent`.
+
+        Returns:
+            Set[Region]: The region's children
+        """
+        return set(self.children)
 
     def generate_id(self) -> str:
-        return f"{self.level}{self.community_id}"
+        # Levels 1-9 are a single digit, so they can be concatenated with the
+        # community ID without ambiguity. Higher levels need a separator, as
+        # e.g. level 1/community 12 and level 11/community 2 would otherwise
+        # both become "112".
+        if self.level < 10:
+            return f"{self.level}{self.community_id}"
+        return f"{self.level}_{self.community_id}"
 
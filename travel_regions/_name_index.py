@@ -0,0 +1,94 @@
+"""
+An approximate string index over node names.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from fuzzysearch import find_near_matches
+
+from ._map_features import Node
+
+
+class NameIndex:
+    """
+    A q-gram index that answers the same approximate substring queries as
+    running ``fuzzysearch.find_near_matches`` against every node name, while
+    only verifying a handful of candidates per query.
+
+    If a pattern of length m occurs within a name with at most k edits, at
+    least m - q + 1 - k * q of the pattern's q-grams also occur in that name.
+    Names sharing fewer of the pattern's q-grams are ruled out by counting
+    posting list hits, and only the remaining candidates are verified with
+    ``find_near_matches``. Patterns too short for this bound to be positive
+    fall back to verifying every name.
+
+    Args:
+        nodes (List[Node]): The nodes to index
+        max_l_dist (int, optional): The maximum Levenshtein distance allowed
+            between a pattern and a name's substring. Defaults to 1.
+    """
+
+    def __init__(self, nodes: List[Node], max_l_dist: int = 1):
+        self.nodes = nodes
+        self.max_l_dist = max_l_dist
+        self.postings = {
+            q: self._build_postings([node.name for node in nodes], q) for q in (3, 2, 1)
+        }
+
+    @staticmethod
+    def _build_postings(names: List[str], q: int) -> Dict[str, np.ndarray]:
+        postings = defaultdict(list)
+        for i, name in enumerate(names):
+            for gram in {name[j : j + q] for j in range(len(name) - q + 1)}:
+                postings[gram].append(i)
+        return {
+            gram: np.array(indices, dtype=np.int32)
+            for gram, indices in postings.items()
+        }
+
+    def _candidates(self, pattern: str) -> Iterable[int]:
+        # Each q with a positive bound rules out names on its own, so a name
+        # is only a candidate if it passes the bounds of all of them. The
+        # smaller q's usually have the higher bound and are the most selective.
+        m = len(pattern)
+        candidates = None
+        for q, postings in self.postings.items():
+            threshold = m - q + 1 - self.max_l_dist * q
+            if threshold < 1:
+                continue
+            hits = [
+                postings[pattern[j : j + q]]
+                for j in range(m - q + 1)
+                if pattern[j : j + q] in postings
+            ]
+            if len(hits) < threshold:
+                return []
+            passes = (
+                np.bincount(np.concatenate(hits), minlength=len(self.nodes))
+                >= threshold
+            )
+            candidates = passes if candidates is None else candidates & passes
+        if candidates is None:
+            return range(len(self.nodes))  # no q-gram bound, verify every name
+        return np.flatnonzero(candidates)
+
+    def search(self, pattern: str) -> List[Tuple[int, int]]:
+        """
+        Finds all nodes whose names contain an approximate match of ``pattern``
+
+        Args:
+            pattern (str): The search term
+
+        Returns:
+            List[Tuple[int, int]]: Indices of matching nodes in ascending order
+                along with the smallest edit distance of their matches
+        """
+        matches = []
+        for i in self._candidates(pattern):
+            near_matches = find_near_matches(
+                pattern, self.nodes[i].name, max_l_dist=self.max_l_dist
+            )
+            if near_matches:
+                matches.append((int(i), min(match.dist for match in near_matches)))
+        return matches
@@ -0,0 +1,320 @@
+"""
+Spatial indexes that are built once per TravelRegions instance and queried in
+bulk.
+"""
+
+from typing import Dict, List, Set, Tuple, Union
+
+import numpy as np
+from matplotlib.path import Path
+from scipy.spatial import cKDTree
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+from ._map_features import Node, Region
+
+
+class RegionIndex:
+    """
+    A spatial index over the regions of a single hierarchical level that
+    classifies large batches of points at once.
+
+    Each polygon making up a region is stored as a closed ring along with its
+    bounding box. Query points are sorted by their first coordinate so that
+    the candidates falling into a ring's bounding box can be sliced out with a
+    binary search, after which a single vectorized point-in-polygon test is run
+    on them.
+
+    Args:
+        geometries (List[Dict]): Serialized region geometries (see
+            :func:`~_geometry.extract_geometries`) in the order of the level's
+            regions.
+    """
+
+    def __init__(self, geometries: List[Dict]):
+        self.size = len(geometries)
+        self.rings: List[Path] = []
+        # For each region, the indices of its rings in ``rings``
+        self.region_rings: List[List[int]] = [[] for _ in geometries]
+        ring_regions = []
+        for i, geometry in enumerate(geometries):
+            if not geometry:
+                continue
+            polygons = (
+                [geometry["geometry"]]
+                if geometry["type"] == "polygon"
+                else geometry["geometry"]
+            )
+            for polygon in polygons:
+                self.region_rings[i].append(len(self.rings))
+                self.rings.append(Path(np.asarray(polygon, dtype=float)))
+                ring_regions.append(i)
+        self.ring_regions = np.array(ring_regions, dtype=np.int32)
+        self.bounds = np.array(
+            [
+                np.concatenate([ring.vertices.min(axis=0), ring.vertices.max(axis=0)])
+                for ring in self.rings
+            ]
+        ).reshape(-1, 4)
+
+    def query(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds every region containing each of the given points. Regions of the
+        same level may overlap slightly where bounding areas meet, so a point
+        can be contained in more than one region.
+
+        Args:
+            points (np.ndarray): An array of shape (n, 2) holding the points'
+                coordinates in the same order as the region geometries, i.e.
+                latitude followed by longitude.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Point indices and the indices of the
+                regions containing them as two arrays of equal length, sorted
+                by point and then by region.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        order = np.argsort(points[:, 0], kind="stable")
+        x = points[order, 0]
+        starts = np.searchsorted(x, self.bounds[:, 0], side="left")
+        ends = np.searchsorted(x, self.bounds[:, 2], side="right")
+        point_indices = [np.empty(0, dtype=np.int64)]
+        region_indices = [np.empty(0, dtype=np.int32)]
+        # Only visit rings whose x-range contains at least one point
+        for i in np.flatnonzero(ends > starts).tolist():
+            _, min_y, _, max_y = self.bounds[i]
+            candidates = order[starts[i] : ends[i]]
+            y = points[candidates, 1]
+            candidates = candidates[(y >= min_y) & (y <= max_y)]
+            if not candidates.size:
+                continue
+            contained = candidates[self.rings[i].contains_points(points[candidates])]
+            point_indices.append(contained)
+            region_indices.append(
+                np.full(len(contained), self.ring_regions[i], dtype=np.int32)
+            )
+        point_indices = np.concatenate(point_indices)
+        region_indices = np.concatenate(region_indices)
+        # A point may fall into several polygons of the same multipolygon
+        pairs = np.unique(
+            np.column_stack([point_indices, region_indices.astype(np.int64)]), axis=0
+        )
+        return pairs[:, 0], pairs[:, 1].astype(np.int32)
+
+    def classify(self, points: np.ndarray) -> np.ndarray:
+        """
+        Finds the region containing each of the given points
+
+        Args:
+            points (np.ndarray): An array of shape (n, 2) holding the points'
+                coordinates in the same order as the region geometries, i.e.
+                latitude followed by longitude.
+
+        Returns:
+            np.ndarray: An array of length n holding for each point the index
+                of the region containing it or -1 if no region does. Points
+                contained in several regions are assigned the lowest index.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        classifications = np.full(len(points), -1, dtype=np.int32)
+        point_indices, region_indices = self.query(points)
+        point_indices, first = np.unique(point_indices, return_index=True)
+        classifications[point_indices] = region_indices[first]
+        return classifications
+
+    def contains(self, points: np.ndarray, region: int) -> np.ndarray:
+        """
+        Tests which of the given points lie within a single region
+
+        Args:
+            points (np.ndarray): An array of shape (n, 2) holding the points'
+                coordinates, i.e. latitude followed by longitude.
+            region (int): The region's index
+
+        Returns:
+            np.ndarray: A boolean array of length n that is True for each point
+                the region contains
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        contained = np.zeros(len(points), dtype=bool)
+        for ring in self.region_rings[region]:
+            min_x, min_y, max_x, max_y = self.bounds[ring]
+            candidates = np.flatnonzero(
+                ~contained
+                & (points[:, 0] >= min_x)
+                & (points[:, 0] <= max_x)
+                & (points[:, 1] >= min_y)
+                & (points[:, 1] <= max_y)
+            )
+            if candidates.size:
+                contained[candidates] = self.rings[ring].contains_points(
+                    points[candidates]
+                )
+        return contained
+
+
+class NodeIndex:
+    """
+    A k-nearest-neighbor index over node coordinates. Latitudes and longitudes
+    are mapped onto 3D unit vectors, whose Euclidean (chord) distances rank
+    neighbors exactly like great-circle distances do, so a KD-tree built once
+    over them answers haversine nearest-neighbor queries.
+
+    Args:
+        nodes (List[Node]): The nodes to index
+    """
+
+    def __init__(self, nodes: List[Node]):
+        self.nodes = nodes
+        self.latlngs = np.array([node.latlng for node in nodes], dtype=float).reshape(
+            -1, 2
+        )
+        self.tree = cKDTree(latlngs_to_unit_vectors(self.latlngs))
+
+    def query(self, points: np.ndarray, k: int = 1) -> np.ndarray:
+        """
+        Finds the ``k`` nearest nodes to each of the given points while
+        skipping nodes whose coordinates are identical to the point's
+
+        Args:
+            points (np.ndarray): An array of shape (n, 2) holding latitude/longitude
+                pairs
+            k (int, optional): Number of neighbors to return per point.
+                Defaults to 1.
+
+        Returns:
+            np.ndarray: An array of shape (n, k) holding node indices ordered
+                by ascending distance, with ``k`` capped at the number of
+                nodes. Rows are padded with -1 if fewer than ``k``
+                non-identical nodes exist.
+        """
+        k = min(k, len(self.nodes))
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        neighbors = np.full((len(points), k), -1, dtype=np.int64)
+        vectors = latlngs_to_unit_vectors(points)
+        pending = np.arange(len(points))
+        k_query = k + 1  # leaves room for a node sitting on the point itself
+        while pending.size:
+            k_query = min(k_query, len(self.nodes))
+            _, indices = self.tree.query(vectors[pending], k=k_query)
+            indices = indices.reshape(len(pending), -1)
+            identical = np.all(
+                self.latlngs[indices] == points[pending, None, :], axis=-1
+            )
+            resolved = (k_query - identical.sum(axis=1) >= k) | (
+                k_query == len(self.nodes)
+            )
+            for row, point_index in zip(np.flatnonzero(resolved), pending[resolved]):
+                candidates = indices[row][~identical[row]][:k]
+                neighbors[point_index, : len(candidates)] = candidates
+            pending = pending[~resolved]
+            k_query *= 2
+        return neighbors
+
+
+def latlngs_to_unit_vectors(latlngs: np.ndarray) -> np.ndarray:
+    """
+    Converts latitude/longitude pairs given in degrees to 3D unit vectors
+
+    Args:
+        latlngs (np.ndarray): An array of shape (n, 2)
+
+    Returns:
+        np.ndarray: An array of shape (n, 3)
+    """
+    lat, lng = np.radians(latlngs).T
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)]
+    )
+
+
+def build_adjacency(regions: List[Region]) -> List[Set[int]]:
+    """
+    Builds the adjacency graph of a hierarchical level. Two regions are
+    adjacent if at least one polygon of each touches the other, which matches
+    :func:`~_map_features.Region.get_neighbors`. Candidate pairs are found
+    through an STRtree over all polygons of the level, so only polygons with
+    intersecting bounding boxes are ever tested.
+
+    Args:
+        regions (List[Region]): All regions of a hierarchical level
+
+    Returns:
+        List[Set[int]]: For each region, the indices of its neighbors in
+            ``regions``
+    """
+    polygons = []
+    polygon_regions = {}
+    for i, region in enumerate(regions):
+        for polygon in region.polygons:
+            polygons.append(polygon)
+            polygon_regions[id(polygon)] = i
+    tree = STRtree(polygons)
+    adjacency = [set() for _ in regions]
+    for i, region in enumerate(regions):
+        for polygon, prepared_polygon in zip(region.polygons, region.prepared_polygons):
+            for candidate in tree.query(polygon):
+                j = polygon_regions[id(candidate)]
+                if j <= i or j in adjacency[i]:
+                    continue  # pairs are symmetric and only tested once
+                if prepared_polygon.touches(candidate):
+                    adjacency[i].add(j)
+                    adjacency[j].add(i)
+    return adjacency
+
+
+def compute_overlaps(
+    regions: List[Region], areas: List[Union[Polygon, MultiPolygon]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the area of intersection of each region with each area. Candidate
+    pairs are found through an STRtree over all polygons of the regions, so
+    pairs with disjoint bounding boxes are never tested. Regions lying
+    entirely inside an area and areas lying entirely inside a region are
+    recognized with prepared predicates, so an actual intersection is only
+    computed where their boundaries cross.
+
+    Args:
+        regions (List[Region]): The regions to compare, e.g. all regions of a
+            hierarchical level
+        areas (List[Union[Polygon, MultiPolygon]]): The areas to compare the
+            regions with
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The region indices, area
+            indices, and intersection areas of all pairs that overlap by
+            more than zero, sorted by area and region
+    """
+    polygons = []
+    polygon_regions = {}
+    for i, region in enumerate(regions):
+        for polygon in region.polygons:
+            polygons.append(polygon)
+            polygon_regions[id(polygon)] = i
+    tree = STRtree(polygons)
+    region_indices = []
+    area_indices = []
+    intersections = []
+    for j, area in enumerate(areas):
+        prepared_area = prep(area)
+        candidates = {polygon_regions[id(polygon)] for polygon in tree.query(area)}
+        for i in sorted(candidates):
+            region = regions[i]
+            if prepared_area.contains(region.shape):
+                intersection = region.area
+            elif not prepared_area.intersects(region.shape):
+                continue
+            elif region.prepared_shape.contains(area):
+                intersection = area.area
+            else:
+                intersection = region.shape.intersection(area).area
+            if intersection > 0:
+                region_indices.append(i)
+                area_indices.append(j)
+                intersections.append(intersection)
+    return (
+        np.array(region_indices, dtype=np.int64),
+        np.array(area_indices, dtype=np.int64),
+        np.array(intersections, dtype=float),
+    )
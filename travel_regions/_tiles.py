@@ -0,0 +1,258 @@
+"""
+Export of a hierarchical level's region geometries as a pyramid of GeoJSON
+tiles in the XYZ scheme used by web maps, so that clients only ever load the
+tiles in view at a level of detail matching the zoom level.
+"""
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from shapely import wkb
+from shapely.geometry import Polygon, box
+
+from ._build import _map
+from ._map_features import Region
+
+# Latitudes beyond which Web Mercator tiles don't extend
+MAX_LATITUDE = 85.0511287798066
+
+# Shared with worker processes through _init_tile_worker() so that each tile
+# task only needs to carry the indices of the regions it overlaps
+_tile_state: Dict = {}
+
+
+def lnglat_to_tile(
+    lngs: np.ndarray, lats: np.ndarray, zoom: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the tiles containing the given coordinates
+
+    Args:
+        lngs (np.ndarray): Longitudes
+        lats (np.ndarray): Latitudes
+        zoom (int): Zoom level
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The tiles' x and y coordinates
+    """
+    tiles = 2 ** zoom
+    lats = np.radians(np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lngs, dtype=float) + 180) / 360 * tiles
+    y = (1 - np.log(np.tan(lats) + 1 / np.cos(lats)) / math.pi) / 2 * tiles
+    return (
+        np.clip(np.floor(x), 0, tiles - 1).astype(np.int64),
+        np.clip(np.floor(y), 0, tiles - 1).astype(np.int64),
+    )
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """
+    Computes a tile's extent
+
+    Args:
+        zoom (int): Zoom level
+        x (int): The tile's column
+        y (int): The tile's row, counted from the north
+
+    Returns:
+        Tuple[float, float, float, float]: The tile's extent as (min_lng,
+            min_lat, max_lng, max_lat)
+    """
+    tiles = 2 ** zoom
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / tiles))))
+
+    return (
+        x / tiles * 360 - 180,
+        latitude(y + 1),
+        (x + 1) / tiles * 360 - 180,
+        latitude(y),
+    )
+
+
+def _init_tile_worker(
+    directory: str,
+    region_properties: List[Dict],
+    shapes: List[bytes],
+    extent: int,
+    buffer: int,
+):
+    _tile_state["directory"] = directory
+    _tile_state["region_properties"] = region_properties
+    _tile_state["shapes"] = [wkb.loads(shape) for shape in shapes]
+    _tile_state["extent"] = extent
+    _tile_state["buffer"] = buffer
+
+
+def _quantize_ring(ring, decimals: int) -> List[List[float]]:
+    # Flips a ring's coordinates to (lng, lat) and rounds them, dropping
+    # vertices that rounding made coincide
+    coordinates = np.round(np.asarray(ring.coords)[:, ::-1], decimals)
+    keep = np.r_[True, np.any(coordinates[1:] != coordinates[:-1], axis=1)]
+    return coordinates[keep].tolist()
+
+
+def _write_tile(task: Tuple[int, int, int, List[int]]) -> int:
+    zoom, x, y, region_indices = task
+    extent, buffer = _tile_state["extent"], _tile_state["buffer"]
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(zoom, x, y)
+    margin_lng = (max_lng - min_lng) * buffer / extent
+    margin_lat = (max_lat - min_lat) * buffer / extent
+    # Region geometries are stored as (lat, lng)
+    clip_box = box(
+        min_lat - margin_lat,
+        min_lng - margin_lng,
+        max_lat + margin_lat,
+        max_lng + margin_lng,
+    )
+    decimals = max(0, math.ceil(math.log10(extent / (max_lng - min_lng))))
+    features = []
+    for i in region_indices:
+        clipped = _tile_state["shapes"][i].intersection(clip_box)
+        polygons = [
+            polygon
+            for polygon in getattr(clipped, "geoms", [clipped])
+            if isinstance(polygon, Polygon) and not polygon.is_empty
+        ]
+        coordinates = []
+        for polygon in polygons:
+            rings = [
+                _quantize_ring(ring, decimals)
+                for ring in [polygon.exterior, *polygon.interiors]
+            ]
+            if len(rings[0]) >= 4:
+                coordinates.append([ring for ring in rings if len(ring) >= 4])
+        if not coordinates:
+            continue
+        properties = _tile_state["region_properties"][i]
+        features.append(
+            {
+                "type": "Feature",
+                "id": properties["id"],
+                "properties": properties,
+                "geometry": {"type": "Polygon", "coordinates": coordinates[0]}
+                if len(coordinates) == 1
+                else {"type": "MultiPolygon", "coordinates": coordinates},
+            }
+        )
+    if not features:
+        return 0
+    tile_directory = os.path.join(_tile_state["directory"], str(zoom), str(x))
+    os.makedirs(tile_directory, exist_ok=True)
+    with open(os.path.join(tile_directory, f"{y}.geojson"), "w") as f:
+        # Encoding in one go is much faster than json.dump()'s chunked writes
+        f.write(
+            json.dumps(
+                {"type": "FeatureCollection", "features": features},
+                separators=(",", ":"),
+            )
+        )
+    return len(features)
+
+
+def _tile_tasks(
+    shapes: List[Polygon], zoom: int
+) -> Iterable[Tuple[int, int, int, List[int]]]:
+    # Lists the regions whose bounding boxes overlap each tile
+    bounds = np.array([shape.bounds for shape in shapes]).reshape(-1, 4)
+    min_x, max_y = lnglat_to_tile(bounds[:, 1], bounds[:, 0], zoom)
+    max_x, min_y = lnglat_to_tile(bounds[:, 3], bounds[:, 2], zoom)
+    tiles: Dict[Tuple[int, int], List[int]] = {}
+    for i in range(len(shapes)):
+        for x in range(min_x[i], max_x[i] + 1):
+            for y in range(min_y[i], max_y[i] + 1):
+                tiles.setdefault((x, y), []).append(i)
+    for (x, y), region_indices in sorted(tiles.items()):
+        yield zoom, x, y, region_indices
+
+
+def export_tiles(
+    regions: List[Region],
+    directory: str,
+    zooms: Iterable[int],
+    extent: int = 4096,
+    buffer: int = 64,
+    workers: int = None,
+) -> Dict[int, int]:
+    """
+    Writes the geometries of a hierarchical level's regions as a pyramid of
+    GeoJSON tiles to ``directory/{z}/{x}/{y}.geojson``. On each zoom level,
+    region geometries are simplified to the size of a tile pixel, clipped to
+    each tile they overlap, and their coordinates rounded to the precision a
+    pixel calls for. Tiles are written one by one as soon as they're clipped,
+    and tiles without any regions are left out.
+
+    Args:
+        regions (List[Region]): The regions to export, e.g. all regions of a
+            hierarchical level
+        directory (str): Where to write the tiles to
+        zooms (Iterable[int]): The zoom levels to write tiles for
+        extent (int, optional): A tile's resolution in pixels per side, which
+            determines how much geometries are simplified and quantized.
+            Defaults to 4096.
+        buffer (int, optional): How many pixels geometries extend beyond a
+            tile's edges so that no seams show between neighboring tiles.
+            Defaults to 64.
+        workers (int, optional): Number of processes to spread the tiles
+            across. Defaults to None, i.e. no parallelism.
+
+    Returns:
+        Dict[int, int]: The number of tiles written per zoom level
+    """
+    region_properties = [
+        {"id": region.id, "level": region.level, "community_id": region.community_id}
+        for region in regions
+    ]
+    os.makedirs(directory, exist_ok=True)
+    tile_counts = {}
+    for zoom in zooms:
+        # Simplify once per zoom level rather than once per tile
+        pixel_size = 360 / (2 ** zoom * extent)
+        shapes = []
+        for region in regions:
+            shape = region.shape.simplify(pixel_size, preserve_topology=True)
+            # Clipping fails on invalid geometries, e.g. ones with nested shells
+            shapes.append(shape if shape.is_valid else shape.buffer(0))
+        initargs = (
+            directory,
+            region_properties,
+            [wkb.dumps(shape) for shape in shapes],
+            extent,
+            buffer,
+        )
+        executor = (
+            ProcessPoolExecutor(
+                workers, initializer=_init_tile_worker, initargs=initargs
+            )
+            if workers
+            else None
+        )
+        if executor is None:
+            _init_tile_worker(*initargs)
+        try:
+            tile_counts[zoom] = sum(
+                feature_count > 0
+                for feature_count in _map(
+                    executor, _write_tile, _tile_tasks(shapes, zoom), chunksize=16
+                )
+            )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    with open(os.path.join(directory, "metadata.json"), "w") as f:
+        json.dump(
+            {
+                "format": "geojson",
+                "scheme": "xyz",
+                "zooms": list(tile_counts),
+                "extent": extent,
+                "tile_counts": tile_counts,
+            },
+            f,
+            indent=4,
+        )
+    return tile_counts
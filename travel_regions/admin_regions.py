@@ -2,15 +2,28 @@
 Functions that facilitate the extraction of country and top-level
 administrative region data including their geometries.
 """
-from ._file_utils import extract_shape
+from ._file_utils import (
+    extract_shape,
+    read_admin_region_store,
+    read_admin_region_store_index,
+    write_admin_region_store,
+)
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Union, Dict
 import os
+import geopandas as gpd
 from shapely.ops import transform
-from shapely import geometry
+from shapely import geometry, wkb
 from pycountry_convert import country_alpha2_to_country_name
 import pycountry
 
+data_directory = os.path.join(
+    Path(os.path.dirname(os.path.abspath(__file__))).parent, "data"
+)
+ADMIN_1_SHAPEFILE = os.path.join(data_directory, "ne_10m_admin_1_states_provinces")
+ADMIN_REGION_STORE = os.path.join(data_directory, "admin_region_geoms.bin")
+
 
 def get_country_codes(identifier: str) -> "pycountry.db.Country":
     """
@@ -51,16 +64,100 @@ def get_admin_regions(country_alpha_2: str):
     pass
 
 
+def _dissolve_admin_regions(
+    admin_1: gpd.GeoDataFrame, country_alpha_2: str
+) -> Dict[str, Union[geometry.Polygon, geometry.MultiPolygon]]:
+    # Unifies a country's admin-1 rows into the geometry of the country and
+    # those of its top-level administrative regions, with coordinates flipped
+    # to (lat, lng)
+    regions = {
+        country_alpha2_to_country_name(country_alpha_2.upper()): transform(
+            lambda x, y: (y, x), admin_1.geometry.unary_union
+        )
+    }
+    for region, rows in admin_1.groupby("gn_name", sort=False):
+        regions[region] = transform(lambda x, y: (y, x), rows.geometry.unary_union)
+    return regions
+
+
+def build_admin_region_store(
+    shapefile_path: str = ADMIN_1_SHAPEFILE, store_path: str = ADMIN_REGION_STORE
+):
+    """
+    Preprocesses the Natural Earth admin-1 shapefile into a store holding the
+    unified geometries of each country and its top-level administrative
+    regions, which :func:`get_admin_region_geoms` reads from instead of the
+    shapefile. This only needs to be run once.
+
+    Args:
+        shapefile_path (str, optional): Path to the admin-1 shapefile.
+            Defaults to the one in the package's data directory.
+        store_path (str, optional): Target location of the store. Defaults to
+            ``admin_region_geoms.bin`` in the package's data directory.
+    """
+    admin_1 = gpd.read_file(shapefile_path)
+    geometries = {}
+    for country_alpha_2, rows in admin_1.groupby("iso_a2", sort=True):
+        try:
+            regions = _dissolve_admin_regions(rows, country_alpha_2)
+        except KeyError:
+            print(f"Skipping unknown country code '{country_alpha_2}'")
+            continue
+        geometries[country_alpha_2] = {
+            name: wkb.dumps(region) for name, region in regions.items()
+        }
+    write_admin_region_store(store_path, geometries)
+    _get_admin_region_store_index.cache_clear()
+    _load_admin_region_geoms.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _get_admin_region_store_index(store_path: str) -> Dict[str, Dict]:
+    return read_admin_region_store_index(store_path)
+
+
+@lru_cache(maxsize=64)
+def _load_admin_region_geoms(
+    country_alpha_2: str, store_path: str, shapefile_path: str
+) -> Dict[str, Union[geometry.Polygon, geometry.MultiPolygon]]:
+    if os.path.exists(store_path):
+        entry = _get_admin_region_store_index(store_path).get(country_alpha_2)
+        if entry is not None:
+            return {
+                name: wkb.loads(region)
+                for name, region in read_admin_region_store(store_path, entry).items()
+            }
+    else:
+        admin_1 = extract_shape(shapefile_path, country_alpha_2)
+        if not admin_1.empty:
+            return _dissolve_admin_regions(admin_1, country_alpha_2)
+    raise Exception(
+        f'No country with ISO 3166-1 alpha-2 code "{country_alpha_2}" found.'
+    )
+
+
 def get_admin_region_geoms(
     country_alpha_2: str,
+    store_path: str = ADMIN_REGION_STORE,
+    shapefile_path: str = ADMIN_1_SHAPEFILE,
 ) -> Dict[str, Union[geometry.Polygon, geometry.MultiPolygon]]:
     """
     Returns a country's geometry and that of its top-level administrative
     regions (e.g. states or provinces).
 
+    The geometries are read from the store written by
+    :func:`build_admin_region_store` if it exists and from the admin-1
+    shapefile otherwise. Recently requested countries are kept in memory.
+
     Args: 
         country_alpha_2 (str): Two-letter country code (i.e. alpha-2) as
             defined in ISO 3166-1
+        store_path (str, optional): Path to the store written by
+            :func:`build_admin_region_store`. Defaults to
+            ``admin_region_geoms.bin`` in the package's data directory.
+        shapefile_path (str, optional): Path to the admin-1 shapefile, used
+            if there is no store. Defaults to the one in the package's data
+            directory.
 
     Raises: Exception: An exception is raised if no country was found that
     corresponds to the provided ISO 3166-1 alpha-2 code.
@@ -69,28 +166,7 @@ def get_admin_region_geoms(
         geometries of the country and its top-level administrative regions as a
         name:geometry mapping.
     """
-    package_directory = os.path.dirname(os.path.abspath(__file__))
-    NED_admin1 = extract_shape(
-        os.path.join(
-            Path(package_directory).parent, "data", "ne_10m_admin_1_states_provinces",
-        ),
-        country_alpha_2,
+    # Copied so that callers modifying the mapping don't alter the cached one
+    return dict(
+        _load_admin_region_geoms(country_alpha_2.upper(), store_path, shapefile_path)
     )
-    if not NED_admin1.empty:
-        regions = {
-            country_alpha2_to_country_name(country_alpha_2.upper()): transform(
-                lambda x, y: (y, x), NED_admin1.geometry.cascaded_union
-            )
-        }
-        for region in NED_admin1.gn_name.values:
-            region_geom = NED_admin1[
-                NED_admin1.gn_name == region
-            ].geometry.cascaded_union
-            region_geom = transform(lambda x, y: (y, x), region_geom)
-            regions[region] = region_geom
-        return regions
-
-    else:
-        raise Exception(
-            f'No country with ISO 3166-1 alpha-2 code "{country_alpha_2}" found.'
-        )
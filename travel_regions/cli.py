@@ -0,0 +1,301 @@
+"""
+The ``travel-regions`` command-line interface.
+
+Usage: travel-regions classify in.csv out.csv [--levels 2,3] [--workers 4]
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from .travel_regions import TravelRegions
+
+LATITUDE_COLUMNS = ("lat", "latitude")
+LONGITUDE_COLUMNS = ("lng", "lon", "long", "longitude")
+
+# Set before the worker processes are forked, so that they share the parent's
+# TravelRegions instance and its spatial indices copy-on-write and each task
+# only needs to carry a chunk of input lines
+_classify_state: Dict = {}
+
+
+def _read_chunks(f: TextIO, chunk_size: int) -> Iterator[List[str]]:
+    # Yields the input's lines in chunks of about chunk_size records. Chunks
+    # are only cut where the number of quotes read so far is even, so that
+    # quoted fields spanning several lines are never split.
+    chunk = []
+    quoted = False
+    for line in f:
+        chunk.append(line)
+        if line.count('"') % 2:
+            quoted = not quoted
+        if len(chunk) >= chunk_size and not quoted:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_coordinates(values: Sequence[str]) -> np.ndarray:
+    # Values that aren't numbers become NaN, which no region contains
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        coordinates = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                coordinates[i] = float(value)
+            except ValueError:
+                continue
+        return coordinates
+
+
+def _classify_chunk(lines: List[str]) -> Tuple[int, str]:
+    # Classifies a chunk of input lines and returns the number of rows as well
+    # as the corresponding output lines, i.e. each row followed by its region
+    # IDs
+    state = _classify_state
+    rows = list(csv.reader(lines, delimiter=state["delimiter"]))
+    points = np.column_stack(
+        [
+            _parse_coordinates([row[index] if len(row) > index else "" for row in rows])
+            for index in state["columns"]
+        ]
+    ).reshape(-1, 2)
+    region_indices = state["travel_regions"].points_to_region_indices(
+        points, state["levels"]
+    )
+    region_ids = zip(
+        *[
+            state["region_ids"][level][region_indices[level]].tolist()
+            for level in state["levels"]
+        ]
+    )
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=state["delimiter"])
+    writer.writerows(row + list(ids) for row, ids in zip(rows, region_ids))
+    return len(rows), output.getvalue()
+
+
+def _find_column(header: List[str], column: str, candidates: Sequence[str]) -> int:
+    names = [name.strip().lower() for name in header]
+    for candidate in [column] if column else candidates:
+        if candidate.lower() in names:
+            return names.index(candidate.lower())
+    raise ValueError(
+        f"None of the columns {[column] if column else list(candidates)} found in {header}"
+    )
+
+
+def classify_csv(
+    travel_regions: TravelRegions,
+    input_path: str,
+    output_path: str,
+    levels: List[int] = None,
+    lat_column: str = None,
+    lng_column: str = None,
+    delimiter: str = ",",
+    chunk_size: int = 50000,
+    workers: int = None,
+    progress: bool = False,
+) -> int:
+    """
+    Classifies the coordinates of a CSV file against the regions of one or
+    more hierarchical levels and writes the input rows, each followed by the
+    ID of the region containing it on every level, to another CSV file.
+
+    The input is read in chunks of ``chunk_size`` rows that are parsed,
+    classified, and formatted by a pool of forked processes sharing
+    ``travel_regions`` with the parent. Output rows follow the order of the
+    input, and only a few chunks per process are held in memory at a time.
+
+    Args:
+        travel_regions (TravelRegions): The regions to classify against
+        input_path (str): Path to a CSV file with a header row
+        output_path (str): Where to write the classified rows to
+        levels (List[int], optional): The hierarchical levels to classify
+            against. Defaults to None, i.e. all loaded levels.
+        lat_column (str, optional): Name of the latitude column. Defaults to
+            None, i.e. the first of ``LATITUDE_COLUMNS`` found in the header.
+        lng_column (str, optional): Name of the longitude column. Defaults to
+            None, i.e. the first of ``LONGITUDE_COLUMNS`` found in the header.
+        delimiter (str, optional): The CSV files' delimiter. Defaults to ",".
+        chunk_size (int, optional): Number of rows per chunk. Defaults to
+            50000.
+        workers (int, optional): Number of processes to classify chunks in.
+            Defaults to None, i.e. classifying in the calling process. Where
+            processes can't be forked, chunks are classified in the calling
+            process as well.
+        progress (bool, optional): Whether to print the number of rows
+            classified so far and the rate to stderr. Defaults to False.
+
+    Returns:
+        int: The number of rows classified
+    """
+    if levels is None:
+        levels = list(travel_regions.regions.keys())
+    for level in levels:
+        if level not in travel_regions.regions:
+            raise ValueError(
+                f"Level {level} isn't among the loaded levels {list(travel_regions.regions)}"
+            )
+    if workers and "fork" not in multiprocessing.get_all_start_methods():
+        print(
+            "Processes can't be forked on this platform, classifying serially",
+            file=sys.stderr,
+        )
+        workers = None
+    # Build the spatial indices before forking so that workers inherit them
+    travel_regions.points_to_region_indices(np.empty((0, 2)), levels)
+
+    with open(input_path, newline="", encoding="utf-8") as input_file, open(
+        output_path, "w", newline="", encoding="utf-8"
+    ) as output_file:
+        header = next(csv.reader(input_file, delimiter=delimiter), None)
+        if header is None:
+            raise ValueError(f"{input_path} is empty, expected a header row")
+        _classify_state.update(
+            travel_regions=travel_regions,
+            levels=levels,
+            columns=(
+                _find_column(header, lat_column, LATITUDE_COLUMNS),
+                _find_column(header, lng_column, LONGITUDE_COLUMNS),
+            ),
+            # Appending "" lets index -1, i.e. no region, map to an empty field
+            region_ids={
+                level: np.append(travel_regions.region_ids[level], "")
+                for level in levels
+            },
+            delimiter=delimiter,
+        )
+        csv.writer(output_file, delimiter=delimiter).writerow(
+            header + [f"region_level_{level}" for level in levels]
+        )
+
+        executor = (
+            ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+            if workers
+            else None
+        )
+        rows = 0
+        start = time.perf_counter()
+
+        def write(chunk_rows: int, output: str):
+            nonlocal rows
+            output_file.write(output)
+            rows += chunk_rows
+            if progress:
+                rate = rows / (time.perf_counter() - start)
+                print(f"\r{rows:,} rows ({rate:,.0f} rows/s)", end="", file=sys.stderr)
+
+        try:
+            # Keep a bounded number of chunks in flight and write their results
+            # in submission order
+            pending = deque()
+            for chunk in _read_chunks(input_file, chunk_size):
+                if executor is None:
+                    write(*_classify_chunk(chunk))
+                    continue
+                if len(pending) >= 2 * workers:
+                    write(*pending.popleft().result())
+                pending.append(executor.submit(_classify_chunk, chunk))
+            while pending:
+                write(*pending.popleft().result())
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            _classify_state.clear()
+        if progress:
+            print(file=sys.stderr)
+    return rows
+
+
+def _parse_levels(value: str) -> List[int]:
+    try:
+        return [int(level) for level in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid levels '{value}', e.g. 2,3")
+
+
+def classify(args: argparse.Namespace):
+    start = time.perf_counter()
+    try:
+        travel_regions = TravelRegions(
+            region_files=args.region_files,
+            levels=None if args.region_files else args.levels,
+        )
+        rows = classify_csv(
+            travel_regions,
+            args.input,
+            args.output,
+            args.levels,
+            args.lat_column,
+            args.lng_column,
+            args.delimiter,
+            args.chunk_size,
+            args.workers,
+            progress=not args.quiet,
+        )
+    except (OSError, ValueError) as e:
+        sys.exit(f"travel-regions classify: error: {e}")
+    if not args.quiet:
+        print(
+            f"Classified {rows:,} rows in {time.perf_counter() - start:.1f}s",
+            file=sys.stderr,
+        )
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="travel-regions",
+        description="A Software Library for Processing and Evaluating Travel Region Models",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classify_parser = subparsers.add_parser(
+        "classify",
+        help="Classify the coordinates of a CSV file",
+        description="Writes the rows of a CSV file, each followed by the ID of "
+        "the region containing its coordinates on every hierarchical level",
+    )
+    classify_parser.add_argument("input", help="CSV file with a header row")
+    classify_parser.add_argument("output", help="Where to write the classified rows")
+    classify_parser.add_argument(
+        "--levels",
+        type=_parse_levels,
+        help="Comma-separated hierarchical levels, e.g. 2,3. Defaults to all.",
+    )
+    classify_parser.add_argument(
+        "--region-files",
+        nargs="+",
+        help="Region files to load instead of the default ones",
+    )
+    classify_parser.add_argument("--lat-column", help="Name of the latitude column")
+    classify_parser.add_argument("--lng-column", help="Name of the longitude column")
+    classify_parser.add_argument("--delimiter", default=",")
+    classify_parser.add_argument("--chunk-size", type=int, default=50000)
+    classify_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of processes, 0 to classify in this process",
+    )
+    classify_parser.add_argument(
+        "--quiet", action="store_true", help="Don't report progress"
+    )
+    classify_parser.set_defaults(function=classify)
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
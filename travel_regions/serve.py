@@ -0,0 +1,420 @@
+"""
+A local HTTP/JSON service around a single, shared :class:`TravelRegions`
+instance. Requests arriving within a short window of each other are coalesced
+into one batched region classification or nearest-node query, so concurrent
+clients share the vectorized lookups instead of running one query per request.
+
+Usage: python -m travel_regions.serve [--port 8000] [--region-files ...]
+
+Endpoints:
+    GET /health: The loaded levels and the number of nodes
+    POST /regions: ``{"points": [[lat, lng], ...], "levels": [2, 3]}`` is
+        answered with ``{"regions": {"2": [region_id, ...], ...}}``, holding
+        None for points outside of all of a level's regions. ``levels`` is
+        optional and defaults to all loaded levels.
+    POST /nearest: ``{"points": [[lat, lng], ...], "k": 1}`` is answered with
+        ``{"nodes": [[{"id": ..., "name": ..., "latlng": ..., "country": ...},
+        ...], ...]}``, i.e. the ``k`` nearest nodes of each point. ``k`` may
+        be at most ``--max-k``.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from ._map_features import Node
+from .travel_regions import TravelRegions
+
+
+class _Batcher:
+    """
+    Collects requests until ``window`` seconds have passed since the first of
+    them or until they hold ``max_size`` points, and then answers all of them
+    with a single call of ``function``
+
+    Args:
+        function (Callable): Takes a list of (points, options) tuples and
+            returns one result per tuple
+        window (float): Maximum number of seconds a request waits for others
+        max_size (int): Number of points after which a batch is run at once
+        executor (Executor): Where batches are run, off the event loop
+    """
+
+    def __init__(
+        self, function: Callable, window: float, max_size: int, executor: Executor
+    ):
+        self.function = function
+        self.window = window
+        self.max_size = max_size
+        self.executor = executor
+        self.pending: List[Tuple[np.ndarray, Any, asyncio.Future]] = []
+        self.size = 0
+        self.flush_handle: asyncio.TimerHandle = None
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, points: np.ndarray, options: Any) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((points, options, future))
+        self.size += len(points)
+        if self.size >= self.max_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending, self.size = self.pending, [], 0
+        self.batches += 1
+        self.requests += len(batch)
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[np.ndarray, Any, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor,
+                self.function,
+                [(points, options) for points, options, _ in batch],
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class RequestError(Exception):
+    """
+    Raised for requests that can't be answered, e.g. because their body is
+    malformed
+
+    Args:
+        status (HTTPStatus): The status to respond with
+        message (str): Explanation sent to the client
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _serialize_node(node: Node) -> Dict:
+    return {
+        "id": node.id,
+        "name": node.name,
+        "latlng": list(node.latlng),
+        "country": node.country,
+    }
+
+
+class RegionServer:
+    """
+    Answers region classification and nearest-node requests over HTTP,
+    batching concurrent requests
+
+    Args:
+        travel_regions (TravelRegions): The instance shared by all requests
+        batch_window (float, optional): Maximum number of seconds a request
+            waits for others to batch it with. Defaults to 0.002.
+        max_batch_size (int, optional): Number of points after which a batch
+            is run without waiting for the window to pass. Defaults to 8192.
+        max_k (int, optional): The most nearest nodes a request may ask for
+            per point. Defaults to 100.
+    """
+
+    def __init__(
+        self,
+        travel_regions: TravelRegions,
+        batch_window: float = 0.002,
+        max_batch_size: int = 8192,
+        max_k: int = 100,
+    ):
+        self.travel_regions = travel_regions
+        self.max_k = min(max_k, len(travel_regions.nodes))
+        # Appending None lets index -1, i.e. no region, map to None
+        self._region_ids = {
+            level: np.append(region_ids, None)
+            for level, region_ids in travel_regions.region_ids.items()
+        }
+        # A single thread runs all batches, so the shared instance's lazily
+        # built indices are never accessed concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.region_batcher = _Batcher(
+            self._classify, batch_window, max_batch_size, self.executor
+        )
+        self.nearest_batcher = _Batcher(
+            self._nearest, batch_window, max_batch_size, self.executor
+        )
+
+    def _classify(
+        self, requests: List[Tuple[np.ndarray, List[int]]]
+    ) -> List[Dict[str, List[str]]]:
+        # Classifies the points of all requests against every level at once
+        points = np.concatenate([points for points, _ in requests])
+        region_indices = self.travel_regions.points_to_region_indices(points)
+        results = []
+        start = 0
+        for request_points, levels in requests:
+            end = start + len(request_points)
+            results.append(
+                {
+                    str(level): self._region_ids[level][
+                        region_indices[level][start:end]
+                    ].tolist()
+                    for level in levels
+                }
+            )
+            start = end
+        return results
+
+    def _nearest(self, requests: List[Tuple[np.ndarray, int]]) -> List[List[List]]:
+        # Queries the requests of each k together, so no request's query is
+        # sized by another request's k
+        results = [None] * len(requests)
+        for k in sorted({k for _, k in requests}):
+            group = [i for i, (_, request_k) in enumerate(requests) if request_k == k]
+            points = np.concatenate([requests[i][0] for i in group])
+            rows = (
+                self.travel_regions.get_nearest_nodes(points, k) if len(points) else []
+            )
+            start = 0
+            for i in group:
+                end = start + len(requests[i][0])
+                results[i] = [
+                    [_serialize_node(node) for node in row] for row in rows[start:end]
+                ]
+                start = end
+        return results
+
+    @staticmethod
+    def _parse_points(payload: Dict) -> np.ndarray:
+        try:
+            points = np.asarray(payload["points"], dtype=float)
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST, "Expected 'points' as [[lat, lng], ...]"
+            )
+        if points.size == 0:
+            return points.reshape(0, 2)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST, "Expected 'points' as [[lat, lng], ...]"
+            )
+        # json.loads() accepts NaN and Infinity, which would fail the whole
+        # batch the request is coalesced into
+        if not (
+            np.isfinite(points).all()
+            and (np.abs(points[:, 0]) <= 90).all()
+            and (np.abs(points[:, 1]) <= 180).all()
+        ):
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST,
+                "Points must have latitudes in [-90, 90] and longitudes in [-180, 180]",
+            )
+        return points
+
+    async def handle(
+        self, method: str, path: str, body: bytes
+    ) -> Tuple[HTTPStatus, Dict]:
+        """
+        Answers a single request
+
+        Args:
+            method (str): The request's HTTP method
+            path (str): The request's path
+            body (bytes): The request's body
+
+        Returns:
+            Tuple[HTTPStatus, Dict]: The response's status and JSON body
+        """
+        try:
+            if path == "/health":
+                if method != "GET":
+                    raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+                return HTTPStatus.OK, {
+                    "levels": list(self.travel_regions.regions),
+                    "nodes": len(self.travel_regions.nodes),
+                }
+            if path not in ("/regions", "/nearest"):
+                raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown path {path}")
+            if method != "POST":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Body isn't valid JSON")
+            if not isinstance(payload, dict):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+            points = self._parse_points(payload)
+            if path == "/regions":
+                levels = payload.get("levels", list(self.travel_regions.regions))
+                if not isinstance(levels, list) or any(
+                    not isinstance(level, int)
+                    or isinstance(level, bool)
+                    or level not in self.travel_regions.regions
+                    for level in levels
+                ):
+                    raise RequestError(
+                        HTTPStatus.BAD_REQUEST,
+                        f"'levels' must be a subset of {list(self.travel_regions.regions)}",
+                    )
+                regions = await self.region_batcher.submit(points, levels)
+                return HTTPStatus.OK, {"regions": regions}
+            k = payload.get("k", 1)
+            if (
+                not isinstance(k, int)
+                or isinstance(k, bool)
+                or not 1 <= k <= self.max_k
+            ):
+                raise RequestError(
+                    HTTPStatus.BAD_REQUEST,
+                    f"'k' must be an integer between 1 and {self.max_k}",
+                )
+            nodes = await self.nearest_batcher.submit(points, k)
+            return HTTPStatus.OK, {"nodes": nodes}
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        # A minimal HTTP/1.1 implementation supporting keep-alive and
+        # Content-Length bodies, which is all JSON clients need
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    body = await reader.readexactly(
+                        int(headers.get("content-length", 0))
+                    )
+                except ValueError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {
+                        "error": "Malformed request"
+                    }
+                    version, headers = "HTTP/1.0", {}
+                else:
+                    try:
+                        status, payload = await self.handle(
+                            method, target.split("?")[0], body
+                        )
+                    except Exception as e:
+                        # Answer rather than drop the connection, e.g. when
+                        # the batch the request was coalesced into failed
+                        print(
+                            f"Error answering {method} {target}: {e!r}", file=sys.stderr
+                        )
+                        status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {
+                            "error": "Internal server error"
+                        }
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                content = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1") + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000):
+        """
+        Starts listening for requests
+
+        Args:
+            host (str, optional): The address to bind to. Defaults to
+                "127.0.0.1".
+            port (int, optional): The port to bind to, 0 picking a free one.
+                Defaults to 8000.
+
+        Returns:
+            asyncio.AbstractServer: The running server
+        """
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serves region lookups for a shared TravelRegions instance"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--region-files",
+        nargs="+",
+        help="Region files to load instead of the default ones",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=2,
+        help="Maximum number of milliseconds a request waits to be batched",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=8192,
+        help="Number of points after which a batch is run without waiting",
+    )
+    parser.add_argument(
+        "--max-k",
+        type=int,
+        default=100,
+        help="The most nearest nodes a request may ask for per point",
+    )
+    args = parser.parse_args()
+
+    travel_regions = TravelRegions(region_files=args.region_files)
+    # Build the lazily built indices before the first request comes in
+    travel_regions.points_to_region_indices(np.zeros((1, 2)))
+    travel_regions.get_nearest_nodes(np.zeros((1, 2)))
+    server = RegionServer(
+        travel_regions, args.batch_window / 1000, args.max_batch_size, args.max_k
+    )
+
+    async def serve():
+        async with await server.start(args.host, args.port) as running_server:
+            for socket in running_server.sockets:
+                print(f"Serving on {socket.getsockname()}")
+            await running_server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,32 @@
-import json
 import os
 from pathlib import Path
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Set, Tuple, Union
 from shapely.geometry.multipolygon import MultiPolygon
 from shapely.geometry.polygon import Polygon
 from fuzzysearch import find_near_matches
-from haversine import haversine
-from pycountry_convert import *
 import os
-from geovoronoi import coords_to_points
-
-from ._map_features import Node, Region
-from ._geometry import (
-    classify_points,
-    extract_geometries,
-    generate_constrained_voronoi_diagram,
-    merge_regions,
-    detect_outliers_z_score,
-    geometry_to_shapely,
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ._map_features import (
+    Node,
+    NodeStore,
+    Region,
+    get_continent_code,
+    get_country_name,
 )
-from ._file_utils import get_communities, read_csv, read_geo_json
+from ._build import build_regions
+from ._build_cache import BuildCache
+from ._file_utils import (
+    read_region_file,
+    read_region_model,
+    write_region_file,
+    write_region_file_binary,
+)
+from ._geometry import geometry_to_shapely, simplify_geometry
+from ._name_index import NameIndex
+from ._spatial_index import NodeIndex, RegionIndex, build_adjacency, compute_overlaps
+from ._tiles import export_tiles
 
 package_directory = os.path.dirname(os.path.abspath(__file__))
 
@@ -31,32 +38,82 @@ class TravelRegions:
     Args:
         region_model (str, optional): Path to a custom region model if one
             should be used instead of the default. Defaults to None.
-        levels (int, optional): The number of hierarchical levels in the
-            region model. Defaults to None.
+        levels (Union[int, List[int]], optional): Either the number of
+            hierarchical levels in the region model or a list of the specific
+            levels to load, in which case only these are parsed and
+            instantiated. Levels 1-4 are loaded by default. Defaults to None.
         region_node_threshold (int): The minimum number of nodes a region
             needs to have to be included in the travel region model.
         z_score_threshold (int): Controls how far away nodes are allowed to
             be from the centers of their communities without being considered outliers.
+        region_files (List[str], optional): Paths to region files to load
+            instead of the default ones, e.g. ones previously generated with
+            :func:`export_regions`. Both JSON (``.json``) and binary
+            (``.bin``) region files are supported. Nodes are taken from
+            ``region_model`` if provided or the default region model
+            otherwise. Defaults to None.
+        workers (int, optional): Number of processes to spread the Voronoi
+            diagrams and region merges of a custom region model across. The
+            result is identical to that of a serial build. On platforms that
+            spawn rather than fork processes, instantiation must be guarded
+            by ``if __name__ == "__main__":``. Defaults to None, i.e. no
+            parallelism.
+        use_cache (bool, optional): Whether to store the regions built from
+            a custom region model on disk and reuse them whenever the region
+            model, bounding areas, and thresholds are identical. Defaults to
+            True.
+        cache_dir (str, optional): Where to store built regions. Defaults to
+            None, i.e. ``~/.cache/travel_regions``.
+        max_cache_size (int, optional): Size in bytes beyond which the least
+            recently used builds are evicted from the cache. Defaults to 1 GiB.
+        previous (TravelRegions, optional): A previous build with the same
+            bounding areas and ``z_score_threshold``, e.g. of an older version
+            of ``region_model``. If given, only the regions of communities
+            that changed since, or that border on nodes that were added,
+            moved, or removed, are regenerated, while all others are carried
+            over from ``previous``. Defaults to None.
     """
 
     def __init__(
         self,
         *bounding_area_paths: List[str],
         region_model: str = None,
-        levels: int = None,
+        levels: Union[int, List[int]] = None,
         region_node_threshold: int = 10,
         z_score_threshold: int = 4,
+        region_files: List[str] = None,
+        workers: int = None,
+        use_cache: bool = True,
+        cache_dir: str = None,
+        max_cache_size: int = 2 ** 30,
+        previous: "TravelRegions" = None,
     ):
         self.z_score_threshold = z_score_threshold
         self.region_node_threshold = region_node_threshold
         self.nodes = {}
         self.regions = {}
         self.regions_serialized = {}
+        self._region_indices: Dict[int, RegionIndex] = {}
+        self._node_index: NodeIndex = None
+        self._name_index: NameIndex = None
+        self._adjacency: Dict[int, List[Set[int]]] = {}
+        self._regions_by_id: Dict[str, Region] = {}
+        self._regions_by_key: Dict[Tuple[int, int], Region] = {}
+        self._regions_by_continent: Dict[str, List[Region]] = {}
+        self._nodes_by_country: Dict[str, np.ndarray] = {}
+        self.region_ids: Dict[int, np.ndarray] = {}
+        if isinstance(levels, int):
+            levels = list(range(1, levels + 1))
+        region_model_data = None
 
         #######################
         # Extract communities #
         #######################
-        if region_model or bounding_area_paths:
+        if region_files:
+            for path in region_files:
+                region_file = read_region_file(path)
+                self.regions_serialized[region_file["level"]] = region_file
+        elif region_model or bounding_area_paths:
             if region_model:
                 assert (
                     levels is not None
@@ -67,154 +124,96 @@ class TravelRegions:
                     "data",
                     "communities_-1__with_distance_multi-level_geonames_cities_7.csv",
                 )
-                levels = 4
+                if levels is None:
+                    levels = list(range(1, 5))
             if not bounding_area_paths:
                 bounding_area_paths = [
                     os.path.join("data", "cutouts", "eu_af_as_au.geojson"),
                     os.path.join("data", "cutouts", "americas.geojson"),
                     os.path.join("data", "cutouts", "nz.geojson"),
                 ]
-            print(
-                "Initializing travel regions with custom parameters. This operation may take some time..."
-            )
 
-            data = read_csv(region_model)
-            # Generate communities for hierarchical levels 1-4
-            communities_by_level = {
-                i: get_communities(data, i) for i in range(1, levels + 1)
+            # Reuse previous builds with identical inputs
+            build_cache = BuildCache(cache_dir, max_cache_size) if use_cache else None
+            cache_keys = (
+                build_cache.keys(
+                    region_model,
+                    bounding_area_paths,
+                    levels,
+                    z_score_threshold,
+                    region_node_threshold,
+                )
+                if build_cache
+                else {}
+            )
+            for level, cache_key in cache_keys.items():
+                regions_serialized = build_cache.get(cache_key)
+                if regions_serialized is not None:
+                    self.regions_serialized[level] = regions_serialized
+            missing_levels = [
+                level for level in levels if level not in self.regions_serialized
+            ]
+
+            if missing_levels:
+                print(
+                    "Initializing travel regions with custom parameters. This operation may take some time..."
+                )
+                region_model_data = read_region_model(region_model)
+                regions_serialized = build_regions(
+                    region_model_data,
+                    missing_levels,
+                    bounding_area_paths,
+                    z_score_threshold,
+                    workers=workers,
+                    previous_regions_serialized=previous.regions_serialized
+                    if previous
+                    else None,
+                )
+                for level in missing_levels:
+                    if build_cache:
+                        build_cache.put(cache_keys[level], regions_serialized[level])
+                    self.regions_serialized[level] = regions_serialized[level]
+            self.regions_serialized = {
+                level: self.regions_serialized[level] for level in levels
             }
-            self.regions_serialized = {}
-            for level, communities in communities_by_level.items():
-                community_IDs = list(communities.keys())
-
-                #####################
-                # Outlier detection #
-                #####################
-                outliers = []
-
-                #####################
-                # Generate polygons #
-                #####################
-                bounding_areas = []
-                voronoi_clusters_by_bounding_area = []
-                nonoutliers_by_community_combined = [
-                    [] for _ in range(len(communities))
-                ]
-                for bounding_area_path in bounding_area_paths:
-                    bounding_area = read_geo_json(bounding_area_path)
-                    bounding_area = list(
-                        map(
-                            lambda point: [point[1], point[0]],
-                            bounding_area["geometry"]["coordinates"][0],
-                        )
-                    )  # flipping coordinates for geovoronoi and Leaflet compatibility
-                    bounding_areas.append(bounding_area)
-                    bounding_area_shape = Polygon(bounding_area)
-
-                    nonoutliers_by_community = []
-                    for community in communities.values():
-                        community_nodes = [point for point in community]
-                        outliers_z_score = detect_outliers_z_score(
-                            [
-                                (float(node[-3]), float(node[-2]))
-                                for node in community_nodes
-                            ],
-                            z_score_threshold,
-                        )
-                        if len(outliers_z_score) > 1:
-                            outlier_indices, _ = zip(*outliers_z_score)
-                        elif len(outliers_z_score) > 0:
-                            outlier_indices = [outliers_z_score[0][0]]
-                        else:
-                            outlier_indices = []
-                        nonoutliers_by_community += [
-                            [
-                                {"id": node[1][0], "latlng": [node[1][8], node[1][9]]}
-                                for node in enumerate(community_nodes)
-                                if node[0] not in outlier_indices
-                                and coords_to_points(
-                                    [[float(node[1][8]), float(node[1][9])]]
-                                )[0].within(bounding_area_shape)
-                            ]
-                        ]
-
-                        outliers.append(
-                            [community_nodes[index] for index in outlier_indices]
-                        )
-                    for i in range(len(nonoutliers_by_community)):
-                        nonoutliers_by_community_combined[
-                            i
-                        ] += nonoutliers_by_community[i]
-                    nonoutliers = [
-                        community_nonoutlier
-                        for community_nonoutliers in nonoutliers_by_community
-                        for community_nonoutlier in community_nonoutliers
-                    ]  # ordered by community
-                    nonoutliers_latlng = [
-                        (float(nonoutlier["latlng"][0]), float(nonoutlier["latlng"][1]))
-                        for nonoutlier in nonoutliers
-                    ]
-                    voronoi_clusters_by_bounding_area.append(
-                        generate_constrained_voronoi_diagram(
-                            nonoutliers_latlng,
-                            bounding_area_shape,
-                            nonoutliers_by_community,
-                        )
-                    )
-                voronoi_clusters = []
-                for i in range(len(community_IDs)):
-                    voronoi_clusters.append([])
-                    for j in range(len(voronoi_clusters_by_bounding_area)):
-                        voronoi_clusters[-1] += (
-                            voronoi_clusters_by_bounding_area[j][i]
-                            if len(voronoi_clusters_by_bounding_area[j]) > i
-                            else []
-                        )
-                merged_voronoi_clusters = merge_regions(
-                    *voronoi_clusters
-                )  # For each cluster, unifies the cluster's single-point voronoi regions into a single polygon
-                region_geometries = extract_geometries(*merged_voronoi_clusters)
-
-                # Generate region file JSON dump
-                self.regions_serialized[level] = {
-                    "level": level,
-                    "community_IDs": community_IDs,
-                    "bounding_area": bounding_areas,
-                    "geometries": region_geometries,
-                    "nodes": nonoutliers_by_community_combined,
-                    "outliers": outliers,
-                }
         else:
-            for level in range(1, 5):
+            for level in levels if levels is not None else range(1, 5):
                 path = os.path.join(
                     Path(package_directory).parent,
                     "data",
                     "region_files",
-                    f"level_{level}_regions.json",
+                    f"level_{level}_regions",
+                )
+                # Prefer the binary version of a region file if one exists
+                self.regions_serialized[level] = read_region_file(
+                    f"{path}.bin" if os.path.exists(f"{path}.bin") else f"{path}.json"
                 )
-                with open(path, "r") as f:
-                    self.regions_serialized[level] = json.load(f)
 
         ################################
         # Load nodes from region model #
         ################################
 
-        data = read_csv(
-            region_model
-            if region_model
-            else os.path.join(
-                Path(package_directory).parent,
-                "data",
-                "communities_-1__with_distance_multi-level_geonames_cities_7.csv",
+        # The region model is only read once, even if regions were built from it
+        if region_model_data is None:
+            region_model_data = read_region_model(
+                region_model
+                if region_model
+                else os.path.join(
+                    Path(package_directory).parent,
+                    "data",
+                    "communities_-1__with_distance_multi-level_geonames_cities_7.csv",
+                )
             )
+        self.node_store = NodeStore(
+            region_model_data.ids,
+            region_model_data.names,
+            region_model_data.latlngs,
+            region_model_data.countries,
         )
-        self.nodes = {}
-        for i, row in enumerate(data):
-            if i == 0:
-                continue  # skip first row (headers)
-            self.nodes[row[0]] = Node(
-                row[0], row[-1], (float(row[-3]), float(row[-2])), row[-4],
-            )
+        self.nodes = {
+            node_id: Node(self.node_store, i)
+            for i, node_id in enumerate(region_model_data.ids.tolist())
+        }
 
         #######################
         # Instantiate regions #
@@ -240,10 +239,19 @@ class TravelRegions:
                             )
                         )
             self.regions[level] = regions
+        self._register_regions()
+        self._link_regions(region_model_data.communities)
         if region_model:
             print("Initialization complete!")
 
-    def export_regions(self, path: str, regions_ids: List[int] = [], level: int = None):
+    def export_regions(
+        self,
+        path: str,
+        regions_ids: List[int] = [],
+        level: int = None,
+        tolerance: float = None,
+        precision: int = None,
+    ):
         """
         Generates a region file for the specified hierarchical level
 
@@ -251,65 +259,202 @@ class TravelRegions:
             level (int): Hierarchical level for which the region file is to be generated
             path (str): Target location in the file system where the region file
                 is to be saved (must include filename). For example,
-                ``path/to/file/my_l2_regions.json``
+                ``path/to/file/my_l2_regions.json``. If the filename ends in
+                ``.bin``, the region file is written in a memory-mappable
+                binary format instead of JSON, and if it ends in ``.geojson``,
+                as a GeoJSON FeatureCollection with one feature per region.
+                JSON and GeoJSON files are streamed to disk one region at a
+                time and gzip-compressed if the filename ends in ``.gz``, e.g.
+                ``my_l2_regions.geojson.gz``.
             region_ids (List[int], optional): An optional list of region IDs if
                 only select regions are to be exported. Defaults to [].
+            tolerance (float, optional): If given, geometries are exported at a
+                lower level of detail, simplified such that their boundaries
+                move by no more than this many degrees. See
+                :func:`~region.get_simplified_geometry`. Defaults to None, i.e.
+                full resolution.
+            precision (int, optional): Number of decimal places to round
+                coordinates in JSON and GeoJSON files to, e.g. 5 for a
+                precision of about one meter. Defaults to None, i.e. full
+                precision.
         """
-        with open(path, "w") as f:
-            if regions_ids:
-                regions_serialized = {
-                    "level": level,
-                    "z_score_threshold": self.z_score_threshold,
-                    "region_node_threshold": self.region_node_threshold,
-                    "community_IDs": [],
-                    "bounding_area": [],
-                    "geometries": [],
-                    "nodes": [],
-                    "outliers": [],
-                }
-                for region_id in regions_ids:
-                    region = self.get_region(str(region_id))
-                    regions_serialized["geometries"].append(region.geometry)
-                    regions_serialized["community_IDs"].append(region.community_id)
-                    regions_serialized["nodes"].append(
-                        [{"latlng": node.latlng} for node in region.nodes]
+        if regions_ids:
+            regions_serialized = {
+                "level": level,
+                "z_score_threshold": self.z_score_threshold,
+                "region_node_threshold": self.region_node_threshold,
+                "community_IDs": [],
+                "bounding_area": [],
+                "geometries": [],
+                "nodes": [],
+                "outliers": [],
+            }
+            for region_id in regions_ids:
+                region = self.get_region(str(region_id))
+                regions_serialized["geometries"].append(
+                    region.get_simplified_geometry(tolerance)
+                    if tolerance
+                    else region.geometry
+                )
+                regions_serialized["community_IDs"].append(region.community_id)
+                regions_serialized["nodes"].append(
+                    [{"latlng": node.latlng} for node in region.nodes]
+                )
+        else:
+            assert (
+                level is not None
+            ), "A hierarchical level must be provided if no regions are specified"
+            regions_serialized = self.regions_serialized[level]
+            if tolerance:
+                regions_serialized = dict(regions_serialized)
+                regions_serialized["geometries"] = [
+                    self._simplify_serialized_geometry(
+                        level, community_ID, geometry, tolerance
                     )
-                json.dump(regions_serialized, f, indent=4)
-            else:
-                assert (
-                    level is not None
-                ), "A hierarchical level must be provided if no regions are specified"
-                json.dump(self.regions_serialized[level], f, indent=4)
+                    for community_ID, geometry in zip(
+                        regions_serialized["community_IDs"],
+                        regions_serialized["geometries"],
+                    )
+                ]
+        if path.endswith(".bin"):
+            write_region_file_binary(path, regions_serialized)
+        else:
+            write_region_file(path, regions_serialized, precision)
 
-    def get_region(self, id: str) -> Region:
+    def export_tiles(
+        self,
+        directory: str,
+        level: int,
+        zooms: List[int] = range(0, 9),
+        workers: int = None,
+    ) -> Dict[int, int]:
+        """
+        Exports a hierarchical level's region geometries as a pyramid of
+        GeoJSON tiles that web maps can load on demand, e.g. via
+        ``directory/{z}/{x}/{y}.geojson``. Geometries are simplified,
+        clipped, and quantized per zoom level, and nodes and outliers are left
+        out. See :func:`~_tiles.export_tiles`.
+
+        Args:
+            directory (str): Where to write the tiles to
+            level (int): Hierarchical level whose regions are to be exported
+            zooms (List[int], optional): The zoom levels to write tiles for.
+                Defaults to zoom levels 0-8.
+            workers (int, optional): Number of processes to spread the tiles
+                across. Defaults to None, i.e. no parallelism.
+
+        Returns:
+            Dict[int, int]: The number of tiles written per zoom level
+        """
+        return export_tiles(self.regions[level], directory, zooms, workers=workers)
+
+    def _simplify_serialized_geometry(
+        self, level: int, community_ID: int, geometry: Dict, tolerance: float
+    ) -> Dict:
+        # Reuses the region's cached simplification if the community made it
+        # into the model
+        if not geometry:
+            return {}
+        region = self._regions_by_key.get((level, community_ID))
+        if region is not None:
+            return region.get_simplified_geometry(tolerance)
+        return simplify_geometry(geometry_to_shapely(geometry), tolerance)
+
+    def get_region(self, id: Union[str, Tuple[int, int]]) -> Region:
         """
         Returns the region with the given ``id``
 
         Args:
-            id (str): Region ID
+            id (Union[str, Tuple[int, int]]): Region ID or region key, i.e. a
+                (level, community ID) tuple. See :attr:`~region.key`.
 
         Returns:
             Region: Region with matching ID
         """
-        for level_regions in self.regions.values():
-            for region in level_regions:
-                if region.id == id:
-                    return region
-        print(f"No region with id {id}")
-        return None
+        region = (
+            self._regions_by_key.get(tuple(id))
+            if isinstance(id, tuple)
+            else self._regions_by_id.get(id)
+        )
+        if region is None:
+            print(f"No region with id {id}")
+        return region
+
+    def neighbors(self, region_id: str) -> Set[Region]:
+        """
+        Returns all regions on the same hierarchical level whose geometries
+        share at least one point with the region with the given ID. See
+        :func:`~region.get_neighbors()` for more. The level's adjacency graph is
+        built on first use, after which lookups are constant-time.
+
+        Args:
+            region_id (str): Region ID
+
+        Returns:
+            Set[Region]: The region's neighbors
+        """
+        region = self.get_region(region_id)
+        if region is None:
+            return None
+        level_regions = self.regions[region.level]
+        return {
+            level_regions[neighbor]
+            for neighbor in self._get_adjacency(region.level)[region.index]
+        }
+
+    def adjacency_list(self, level: int) -> Dict[str, List[str]]:
+        """
+        Returns the adjacency graph of a hierarchical level as an adjacency list
+
+        Args:
+            level (int): Hierarchical level
+
+        Returns:
+            Dict[str, List[str]]: A mapping from each region's ID to the IDs of
+                its neighbors
+        """
+        level_regions = self.regions[level]
+        return {
+            region.id: [level_regions[neighbor].id for neighbor in sorted(neighbors)]
+            for region, neighbors in zip(level_regions, self._get_adjacency(level))
+        }
+
+    def adjacency_matrix(self, level: int) -> csr_matrix:
+        """
+        Returns the adjacency graph of a hierarchical level as a sparse matrix
+
+        Args:
+            level (int): Hierarchical level
+
+        Returns:
+            csr_matrix: A symmetric boolean matrix whose rows and columns follow
+                the order of ``self.regions[level]``
+        """
+        adjacency = self._get_adjacency(level)
+        rows = np.repeat(np.arange(len(adjacency)), [len(n) for n in adjacency])
+        columns = np.array(
+            [neighbor for neighbors in adjacency for neighbor in sorted(neighbors)],
+            dtype=np.int64,
+        )
+        return csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, columns)),
+            shape=(len(adjacency), len(adjacency)),
+        )
 
     def get_country_regions(
         self, country: str, level: int, include_multipolygons: bool = True
     ) -> List[str]:
+        node_indices = self._nodes_by_country.get(str.upper(country))
+        region_indices = (
+            self.node_store.region_indices[level][node_indices]
+            if node_indices is not None and level in self.node_store.region_indices
+            else np.empty(0, dtype=np.int32)
+        )
         matching_regions = [
-            node.regions[level].id
-            for node in self.nodes.values()
-            if node.country == str.upper(country)
-            and level in node.regions
-            and (
-                include_multipolygons
-                or node.regions[level].geometry["type"] == "polygon"
-            )
+            self.region_ids[level][index]
+            for index in region_indices[region_indices >= 0].tolist()
+            if include_multipolygons
+            or self.regions[level][index].geometry["type"] == "polygon"
         ]
         if matching_regions:
             return matching_regions
@@ -372,11 +517,28 @@ class TravelRegions:
         Returns:
             List[Node]: All nodes whose names fulfill the matching criteria
         """
+        name_index = self._get_name_index()
+        return [name_index.nodes[i] for i, _ in name_index.search(name)]
+
+    def find_nodes(self, names: List[str], top_k: int = None) -> List[List[Node]]:
+        """
+        Searches for several nodes by name at once. Matches for each name are
+        ranked by their edit distance to it, with ties kept in node order.
+
+        Args:
+            names (List[str]): Location names
+            top_k (int, optional): The maximum number of matches to return
+                per name. Defaults to None, i.e. all matches.
+
+        Returns:
+            List[List[Node]]: For each name, the nodes whose names fulfill the
+                matching criteria, closest matches first
+        """
+        name_index = self._get_name_index()
         hits = []
-        for node in self.nodes.values():
-            matches = find_near_matches(name, node.name, max_l_dist=1)
-            if matches:
-                hits.append(node)
+        for name in names:
+            matches = sorted(name_index.search(name), key=lambda match: match[1])
+            hits.append([name_index.nodes[i] for i, _ in matches[:top_k]])
         return hits
 
     def get_continent_regions(self, continent: str) -> List[Region]:
@@ -389,28 +551,7 @@ class TravelRegions:
         Returns:
             List[Region]: Regions with at least one node in the given continent
         """
-        continent_regions = set()
-        for level_regions in self.regions.values():
-            for region in level_regions:
-                for country in region.countries:
-                    country = country_name_to_country_alpha2(
-                        country, cn_name_format="default"
-                    )
-                    try:
-                        country_continent = country_alpha2_to_continent_code(country)
-                    except KeyError:
-                        try:
-                            country_continent = {"EH": "AF", "VA": "EU", "PN": "OC"}[
-                                country
-                            ]
-                        except KeyError as key:
-                            print(
-                                f"Country code {key} found neither in pycountry_convert nor in custom dict!"
-                            )
-                            continue
-                    if country_continent == continent:
-                        continent_regions.add(region)
-        return list(continent_regions)
+        return list(self._regions_by_continent.get(continent, []))
 
     def get_nearest_node(self, point: Tuple[float, float]) -> Node:
         """
@@ -424,12 +565,158 @@ class TravelRegions:
         Returns:
             Node: The closest, non-identical node to point
         """
-        nodes = [
-            node for node in self.nodes.values() if node.latlng != point
-        ]  # extract all nodes
-        distances = [haversine(point, node.latlng) for node in nodes]
-        nearest_node = nodes[distances.index(min(distances))]
-        return nearest_node
+        return self.get_nearest_nodes([point])[0][0]
+
+    def get_nearest_nodes(
+        self, points: Union[np.ndarray, List[Tuple[float, float]]], k: int = 1
+    ) -> List[List[Node]]:
+        """
+        Uses Haversine distance to return the ``k`` nearest known nodes to each
+        of ``points`` whose coordinates aren't identical to it. The underlying
+        spatial index is built on the first call and reused afterwards.
+
+        Args:
+            points (Union[np.ndarray, List[Tuple[float, float]]]): The
+                coordinates of the points whose nearest nodes are to be found
+            k (int, optional): The number of nodes to return per point.
+                Defaults to 1.
+
+        Returns:
+            List[List[Node]]: For each point, its ``k`` closest, non-identical
+                nodes ordered by ascending distance
+        """
+        if self._node_index is None:
+            self._node_index = NodeIndex(list(self.nodes.values()))
+        nodes = self._node_index.nodes
+        return [
+            [nodes[index] for index in row if index >= 0]
+            for row in self._node_index.query(points, k)
+        ]
+
+    def points_to_region_indices(
+        self,
+        points: Union[np.ndarray, List[Tuple[float, float]]],
+        levels: List[int] = None,
+    ) -> Dict[int, np.ndarray]:
+        """
+        Classifies ``points`` in bulk against the regions of each hierarchical
+        level. The spatial index of a level is built on its first use and
+        reused by all subsequent calls.
+
+        Args:
+            points (Union[np.ndarray, List[Tuple[float, float]]]): The points of
+                interest as latitude/longitude pairs
+            levels (List[int], optional): The hierarchical levels to classify
+                the points against. Defaults to all levels.
+
+        Returns:
+            Dict[int, np.ndarray]: A mapping from each level to an array holding
+                for every point the index of the region in ``self.regions[level]``
+                that contains it, or -1 if no region on that level does. The
+                indices can be used with ``self.region_ids[level]`` to look up
+                region IDs in bulk.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return {
+            level: self._get_region_index(level).classify(points)
+            for level in (levels if levels is not None else self.regions.keys())
+        }
+
+    def points_to_region_paths(
+        self,
+        points: Union[np.ndarray, List[Tuple[float, float]]],
+        levels: List[int] = None,
+    ) -> Dict[int, np.ndarray]:
+        """
+        Like :func:`points_to_region_indices`, but classifies ``points`` top-down
+        along the region hierarchy. Points are only classified against all
+        regions on the topmost level, and on every level below that only
+        against the children of the region they were assigned on the level
+        above (see :func:`~region.get_children`). Points not contained in any
+        of these children, e.g. because they lie close to a border that
+        differs between levels, are classified against all regions of the
+        level instead. The result only differs from that of
+        :func:`points_to_region_indices` for points lying where several
+        regions of a level overlap.
+
+        Args:
+            points (Union[np.ndarray, List[Tuple[float, float]]]): The points of
+                interest as latitude/longitude pairs
+            levels (List[int], optional): The hierarchical levels to classify
+                the points against. Defaults to all levels.
+
+        Returns:
+            Dict[int, np.ndarray]: A mapping from each level to an array holding
+                for every point the index of the region in ``self.regions[level]``
+                that contains it, or -1 if no region on that level does
+
+        Raises:
+            ValueError: If any of ``levels`` isn't loaded
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        levels = sorted(levels if levels is not None else self.regions.keys())
+        for level in levels:
+            if level not in self.regions:
+                raise ValueError(
+                    f"Level {level} isn't among the loaded levels {list(self.regions)}"
+                )
+        if not levels:
+            return {}
+        region_paths = {}
+        parents = None
+        parent_level = None
+        for level in sorted(self.regions):
+            if level > levels[-1]:
+                break
+            region_index = self._get_region_index(level)
+            if parents is None:
+                classifications = region_index.classify(points)
+            else:
+                classifications = np.full(len(points), -1, dtype=np.int32)
+                # Group the points by the region they were assigned above
+                classified = np.flatnonzero(parents >= 0)
+                classified = classified[np.argsort(parents[classified], kind="stable")]
+                parent_indices, starts = np.unique(
+                    parents[classified], return_index=True
+                )
+                groups = np.split(classified, starts[1:])
+                for parent_index, group in zip(parent_indices.tolist(), groups):
+                    for child in self.regions[parent_level][parent_index].children:
+                        if not group.size:
+                            break
+                        contained = region_index.contains(points[group], child.index)
+                        classifications[group[contained]] = child.index
+                        group = group[~contained]
+                unclassified = np.flatnonzero(classifications < 0)
+                if unclassified.size:
+                    classifications[unclassified] = region_index.classify(
+                        points[unclassified]
+                    )
+            if level in levels:
+                region_paths[level] = classifications
+            parents = classifications
+            parent_level = level
+        return region_paths
+
+    def get_region_path(self, point: Tuple[float, float]) -> List[Region]:
+        """
+        Finds the regions containing ``point`` on every hierarchical level
+        through a top-down search. See :func:`points_to_region_paths`.
+
+        Args:
+            point (Tuple[float, float]): The point of interest as a
+                latitude/longitude pair
+
+        Returns:
+            List[Region]: The regions containing the point, ordered from the
+                topmost level down. Levels on which no region contains the
+                point are left out.
+        """
+        return [
+            self.regions[level][classifications[0]]
+            for level, classifications in self.points_to_region_paths([point]).items()
+            if classifications[0] >= 0
+        ]
 
     def points_to_regions(
         self, points: List[Tuple[float, float]]
@@ -445,20 +732,112 @@ class TravelRegions:
                 points. A point may be mapped to multiple regions if regions from
                 multiple hierarchical levels were used.
         """
-        regions = []
-        for level_regions in self.regions.values():
-            regions += [region for region in level_regions]
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        region_mappings = {}
+        for level, level_regions in self.regions.items():
+            point_indices, region_indices = self._get_region_index(level).query(points)
+            # Group point indices by region in a single pass
+            order = np.argsort(region_indices, kind="stable")
+            counts = np.bincount(region_indices, minlength=len(level_regions))
+            groups = np.split(point_indices[order], np.cumsum(counts)[:-1])
+            for region, group in zip(level_regions, groups):
+                region_mappings[region.id] = [tuple(point) for point in points[group]]
+        return region_mappings
+
+    def _get_name_index(self) -> NameIndex:
+        if self._name_index is None:
+            self._name_index = NameIndex(list(self.nodes.values()))
+        return self._name_index
+
+    def _get_adjacency(self, level: int) -> List[Set[int]]:
+        if level not in self._adjacency:
+            self._adjacency[level] = build_adjacency(self.regions[level])
+        return self._adjacency[level]
+
+    def _register_regions(self):
+        """
+        Assigns each region its dense index within its level and fills the
+        lookup tables used by :func:`get_region`,
+        :func:`get_country_regions`, and :func:`get_continent_regions`
+        """
+        self._regions_by_id = {}
+        self._regions_by_key = {}
+        self._regions_by_continent = {}
+        self._nodes_by_country = {}
+        self.region_ids = {}
+        order = np.argsort(self.node_store.countries, kind="stable")
+        countries, starts = np.unique(
+            self.node_store.countries[order], return_index=True
+        )
+        for country, node_indices in zip(countries, np.split(order, starts[1:])):
+            self._nodes_by_country[str(country)] = node_indices
+        for level, level_regions in self.regions.items():
+            for i, region in enumerate(level_regions):
+                region.index = i
+                self._regions_by_id[region.id] = region
+                self._regions_by_key[region.key] = region
+                continents = set()
+                for country in region.country_code_counts:
+                    if get_country_name(country) is None:
+                        continue  # not among the region's countries
+                    continent = get_continent_code(country)
+                    if continent is None:
+                        print(
+                            f"Country code '{country}' found neither in pycountry_convert nor in custom dict!"
+                        )
+                        continue
+                    continents.add(continent)
+                for continent in continents:
+                    self._regions_by_continent.setdefault(continent, []).append(region)
+            self.region_ids[level] = np.array(
+                [region.id for region in level_regions], dtype=object
+            )
+            self.node_store.assign_regions(level, level_regions)
 
-        region_geometries = [
-            Polygon(region.geometry["geometry"])
-            if region.geometry["type"] == "polygon"
-            else MultiPolygon(
-                [Polygon(geometry) for geometry in region.geometry["geometry"]]
+    def _link_regions(self, communities: np.ndarray):
+        """
+        Links every region to its parent on the closest coarser level that was
+        loaded, i.e. the region of the community that most of the region's
+        community's nodes belong to on that level, and the parent back to
+        the region as one of its children
+
+        Args:
+            communities (np.ndarray): Each node's community on every level of
+                the region model, see :attr:`~_file_utils.RegionModel.communities`
+        """
+        levels = sorted(self.regions)
+        for level in levels:
+            for region in self.regions[level]:
+                region.parent = None
+                region.children = []
+        for parent_level, level in zip(levels, levels[1:]):
+            if level > communities.shape[1]:
+                break
+            # Count how many nodes each pair of communities shares and keep the
+            # parent community with the most nodes (the lowest ID on ties)
+            pairs, counts = np.unique(
+                communities[:, [level - 1, parent_level - 1]],
+                axis=0,
+                return_counts=True,
+            )
+            order = np.lexsort((pairs[:, 1], -counts, pairs[:, 0]))
+            pairs = pairs[order]
+            first = np.r_[True, pairs[1:, 0] != pairs[:-1, 0]]
+            parent_communities = dict(pairs[first].tolist())
+            for region in self.regions[level]:
+                parent = self._regions_by_key.get(
+                    (parent_level, parent_communities.get(region.community_id))
+                )
+                if parent is not None:
+                    region.parent = parent
+                    parent.children.append(region)
+
+    def _get_region_index(self, level: int) -> RegionIndex:
+        if level not in self._region_indices:
+            self._region_indices[level] = RegionIndex(
+                [region.geometry for region in self.regions[level]]
             )
-            for region in regions
-        ]  # convert region geometries to Shapely polygons
-        classifications = classify_points(points, region_geometries)
-        return {regions[index].id: points for index, points in classifications.items()}
+        return self._region_indices[level]
 
     def compare_overlap(
         self,
@@ -483,17 +862,68 @@ class TravelRegions:
             intersection of the two as a percentage of the region and whose second
             element is the intersection as a percentage of the area.
         """
+        level_regions = self.regions[level]
+        region_indices, _, intersections = compute_overlaps(level_regions, [area])
         overlapping_regions = {}
-        for region in self.regions[level]:
-            region_geom = geometry_to_shapely(
-                region.geometry
-            )  # Convert geometry to Shapely Polygons/MultiPolygons
-            intersection = region_geom.intersection(area).area
-            intersection_as_region_percentage = (intersection / region_geom.area) * 100
-            intersection_as_area_percentage = (intersection / area.area) * 100
-            if intersection > 0:
-                overlapping_regions[region.id] = (
-                    intersection_as_region_percentage,
-                    intersection_as_area_percentage,
-                )
+        for i, intersection in zip(region_indices, intersections):
+            region = level_regions[i]
+            overlapping_regions[region.id] = (
+                (intersection / region.area) * 100,
+                (intersection / area.area) * 100,
+            )
         return overlapping_regions
+
+    def compare_overlaps(
+        self,
+        areas: List[Union[Polygon, MultiPolygon]],
+        levels: List[int] = None,
+    ) -> Dict[int, Tuple[csr_matrix, csr_matrix]]:
+        """
+        Batch version of :func:`compare_overlap` that compares many areas with
+        the travel regions of several hierarchical levels at once. Only
+        regions and areas whose bounding boxes intersect are compared, and
+        intersections are only computed where their boundaries cross.
+
+        Args:
+            areas (List[Union[Polygon, MultiPolygon]]): Shapely Polygons or
+                MultiPolygons describing the areas' geometries
+            levels (List[int], optional): The hierarchical levels at which to
+                search for overlapping travel regions. Defaults to None, i.e.
+                all levels.
+
+        Returns:
+            Dict[int, Tuple[csr_matrix, csr_matrix]]: For each level, two sparse
+                matrices whose rows follow the order of ``self.regions[level]``
+                and whose columns follow the order of ``areas``. The first holds
+                each intersection as a percentage of the region, the second as
+                a percentage of the area. Pairs that don't overlap are left
+                empty.
+        """
+        if levels is None:
+            levels = list(self.regions.keys())
+        area_sizes = np.array([area.area for area in areas], dtype=float)
+        overlaps = {}
+        for level in levels:
+            level_regions = self.regions[level]
+            region_indices, area_indices, intersections = compute_overlaps(
+                level_regions, areas
+            )
+            region_sizes = np.array([region.area for region in level_regions])
+            shape = (len(level_regions), len(areas))
+            overlaps[level] = (
+                csr_matrix(
+                    (
+                        intersections / region_sizes[region_indices] * 100,
+                        (region_indices, area_indices),
+                    ),
+                    shape=shape,
+                ),
+                csr_matrix(
+                    (
+                        intersections / area_sizes[area_indices] * 100,
+                        (region_indices, area_indices),
+                    ),
+                    shape=shape,
+                ),
+            )
+        return overlaps